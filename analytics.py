@@ -0,0 +1,227 @@
+import hashlib
+import os
+import threading
+import time
+
+import duckdb
+import pandas as pd
+
+
+# sheet header -> (table column, DuckDB type)
+INVENTORY_COLUMNS = {
+    "Timestamp": ("ts", "TIMESTAMP"),
+    "Form Type": ("form_type", "VARCHAR"),
+    "Barcode": ("barcode", "VARCHAR"),
+    "Item Name": ("item_name", "VARCHAR"),
+    "Qty": ("qty", "DOUBLE"),
+    "Cost": ("cost", "DOUBLE"),
+    "Selling": ("selling", "DOUBLE"),
+    "Amount": ("amount", "DOUBLE"),
+    "GP%": ("gp", "DOUBLE"),
+    "Expiry": ("expiry", "DATE"),
+    "Supplier": ("supplier", "VARCHAR"),
+    "Remarks": ("remarks", "VARCHAR"),
+    "Outlet": ("outlet", "VARCHAR"),
+    "Staff Name": ("staff", "VARCHAR"),
+    "Record ID": ("record_id", "VARCHAR"),
+}
+
+FEEDBACK_COLUMNS = {
+    "Submitted At": ("ts", "TIMESTAMP"),
+    "Customer Name": ("customer", "VARCHAR"),
+    "Rating": ("rating", "DOUBLE"),
+    "Outlet": ("outlet", "VARCHAR"),
+    "Feedback": ("feedback", "VARCHAR"),
+    "Record ID": ("record_id", "VARCHAR"),
+}
+
+TABLES = {"inventory": INVENTORY_COLUMNS, "feedback": FEEDBACK_COLUMNS}
+
+LOSS_GROUPS = {
+    "Outlet": "outlet",
+    "Supplier": "supplier",
+    "Form Type": "form_type",
+    "Week": "date_trunc('week', ts)::DATE",
+    "Day": "ts::DATE",
+}
+
+EXPORT_DIR = ".exports"
+
+# label -> (file extension, mime type, DuckDB COPY options)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv", "FORMAT CSV, HEADER"),
+    "CSV (gzip)": ("csv.gz", "application/gzip", "FORMAT CSV, HEADER, COMPRESSION gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", "FORMAT PARQUET, COMPRESSION zstd"),
+}
+
+
+def typed_frame(df, columns):
+    """Coerces sheet rows (all loosely typed) into the table's column types."""
+    out = pd.DataFrame(index=df.index)
+    for header, (name, sql_type) in columns.items():
+        col = df[header] if header in df.columns else pd.Series(None, index=df.index, dtype="object")
+        if sql_type == "TIMESTAMP":
+            out[name] = pd.to_datetime(col, errors="coerce")
+        elif sql_type == "DATE":
+            out[name] = pd.to_datetime(col, format="%d-%b-%y", errors="coerce").dt.date
+        elif name == "rating":
+            out[name] = pd.to_numeric(col.astype("string").str.extract(r"([\d.]+)")[0], errors="coerce")
+        elif sql_type == "DOUBLE":
+            out[name] = pd.to_numeric(col, errors="coerce")
+        else:
+            out[name] = col.astype("string").str.strip()
+    return out
+
+
+class RecordsEngine:
+    """
+    Embedded DuckDB copy of the saved inventory and feedback records.
+    Rows are loaded incrementally from the sheet cache frames; filters and
+    aggregations run inside DuckDB so the UI only receives the result set.
+    """
+
+    def __init__(self, database=":memory:"):
+        self._db = duckdb.connect(database)
+        self._lock = threading.Lock()
+        self._loaded = {}
+        self._versions = {}
+        for table, columns in TABLES.items():
+            cols = ", ".join(f"{name} {sql_type}" for name, sql_type in columns.values())
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols})")
+            self._loaded[table] = 0
+            self._versions[table] = None
+
+    def sync(self, table, frame):
+        """
+        Inserts the rows appended to the sheet cache frame since the last call
+        into `table`. If the frame got shorter (the cache re-read the sheet),
+        the table is emptied and loaded again from the start.
+        """
+        with self._lock:
+            loaded = self._loaded[table]
+            if len(frame) == loaded:
+                return 0
+            if len(frame) < loaded:
+                self._db.execute(f"DELETE FROM {table}")
+                self._versions[table] = None
+                loaded = 0
+            staged = typed_frame(frame.iloc[loaded:], TABLES[table])
+            self._loaded[table] = len(frame)
+            if staged.empty:
+                return 0
+            self._db.register("staged", staged)
+            try:
+                self._db.execute(f"INSERT INTO {table} SELECT * FROM staged")
+            finally:
+                self._db.unregister("staged")
+            # Identifies the content, not this process: export files are shared
+            # by every worker and outlive restarts. The sheets are append-only,
+            # so row count plus the last row's Record ID and timestamp pin it.
+            last = staged.iloc[-1]
+            self._versions[table] = (len(frame), str(last["record_id"]), str(last["ts"]))
+            return len(staged)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, list(params)).df()
+
+    @staticmethod
+    def _where(outlets=None, form_types=None, start=None, end=None, min_rating=None, max_rating=None):
+        clauses, params = [], []
+        if outlets:
+            clauses.append(f"outlet IN ({', '.join('?' * len(outlets))})")
+            params.extend(outlets)
+        if form_types:
+            clauses.append(f"form_type IN ({', '.join('?' * len(form_types))})")
+            params.extend(form_types)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(pd.Timestamp(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(pd.Timestamp(end) + pd.Timedelta(days=1))
+        if min_rating is not None:
+            clauses.append("rating >= ?")
+            params.append(min_rating)
+        if max_rating is not None:
+            clauses.append("rating <= ?")
+            params.append(max_rating)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, table, **filters):
+        where, params = self._where(**filters)
+        return int(self._query(f"SELECT COUNT(*) AS n FROM {table}{where}", params)["n"].iloc[0])
+
+    def records(self, table, limit=500, **filters):
+        """Newest-first filtered rows, renamed back to the sheet headers."""
+        where, params = self._where(**filters)
+        select = ", ".join(f'{name} AS "{header}"' for header, (name, _) in TABLES[table].items())
+        params.append(limit)
+        return self._query(f"SELECT {select} FROM {table}{where} ORDER BY ts DESC NULLS LAST LIMIT ?", params)
+
+    def export(self, table, fmt="CSV", export_dir=EXPORT_DIR, max_age_s=3600, **filters):
+        """
+        Writes the filtered rows to a file with DuckDB's streaming COPY and
+        returns its path. Files are keyed on the table contents, format and
+        filters, so repeat downloads of unchanged data reuse the same file.
+        """
+        ext, _, options = EXPORT_FORMATS[fmt]
+        where, params = self._where(**filters)
+        key = repr((table, self._versions[table], fmt, sorted(filters.items(), key=lambda kv: kv[0])))
+        path = os.path.join(export_dir, f"{table}_{hashlib.sha1(key.encode()).hexdigest()[:16]}.{ext}")
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(export_dir, exist_ok=True)
+        now = time.time()
+        for name in os.listdir(export_dir):
+            old = os.path.join(export_dir, name)
+            if now - os.path.getmtime(old) > max_age_s:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+        select = ", ".join(f'{name} AS "{header}"' for header, (name, _) in TABLES[table].items())
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        cursor = self._db.cursor()
+        try:
+            cursor.execute(
+                f"COPY (SELECT {select} FROM {table}{where} ORDER BY ts) TO '{tmp}' ({options})",
+                params,
+            )
+        finally:
+            cursor.close()
+        os.replace(tmp, path)
+        return path
+
+    def loss_summary(self, group_by="Outlet", **filters):
+        """Loss Amount/Qty per outlet, supplier, form type, week or day."""
+        where, params = self._where(**filters)
+        key = LOSS_GROUPS[group_by]
+        return self._query(
+            f'SELECT {key} AS "{group_by}", SUM(amount) AS "Amount", SUM(qty) AS "Qty", '
+            f'COUNT(*) AS "Records", ROUND(AVG(gp), 2) AS "Avg GP%" '
+            f'FROM inventory{where} GROUP BY 1 ORDER BY "Amount" DESC NULLS LAST',
+            params,
+        )
+
+    def top_items(self, n=10, **filters):
+        """The n items with the highest total loss Amount."""
+        where, params = self._where(**filters)
+        params.append(n)
+        return self._query(
+            'SELECT barcode AS "Barcode", any_value(item_name) AS "Item Name", '
+            'SUM(qty) AS "Qty", SUM(amount) AS "Amount" '
+            f'FROM inventory{where} GROUP BY barcode ORDER BY "Amount" DESC NULLS LAST LIMIT ?',
+            params,
+        )
+
+    def rating_summary(self, **filters):
+        """Average customer rating and feedback count per outlet."""
+        where, params = self._where(**filters)
+        return self._query(
+            'SELECT outlet AS "Outlet", ROUND(AVG(rating), 2) AS "Avg Rating", COUNT(*) AS "Feedback" '
+            f'FROM feedback{where} GROUP BY outlet ORDER BY "Avg Rating" DESC',
+            params,
+        )
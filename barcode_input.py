@@ -0,0 +1,28 @@
+import os
+
+import streamlit.components.v1 as components
+
+
+# EAN-8, UPC-A, EAN-13 and GTIN-14.
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+_component = components.declare_component(
+    "barcode_input", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "barcode_frontend")
+)
+
+
+def barcode_input(label, key, value="", placeholder="", auto_submit=True, debounce_ms=400):
+    """
+    A barcode text box that opens the numeric keyboard on phones (inputmode
+    is set in its own frame, once), submits on Enter as scan guns send it,
+    and with `auto_submit` also submits a typed code `debounce_ms` after the
+    last keystroke once it is a full GTIN with a valid check digit.
+
+    Returns the latest submission as {"barcode": str, "seq": int}, or None
+    before the first. `seq` changes on every submit, so scanning the same
+    code twice still registers; compare it with the last handled one.
+    """
+    return _component(
+        label=label, value=value, placeholder=placeholder, auto_submit=auto_submit,
+        debounce_ms=debounce_ms, lengths=list(GTIN_LENGTHS), key=key, default=None,
+    )
@@ -0,0 +1,39 @@
+import random
+import string
+
+from openpyxl import Workbook
+
+
+SUPPLIERS = 400
+WORDS = 6000
+
+
+def _words(rng, count, lo=3, hi=9):
+    return ["".join(rng.choices(string.ascii_uppercase, k=rng.randint(lo, hi))) for _ in range(count)]
+
+
+def write_catalog(path, rows, seed=7, duplicate_rate=0.01):
+    """
+    Writes a synthetic alllist.xlsx with the real column layout.
+    Barcodes are EAN-13 numbers stored as numbers (like the real export),
+    with a small share of duplicate barcodes. Returns the barcodes written.
+    """
+    rng = random.Random(seed)
+    words = _words(rng, WORDS)
+    suppliers = [f"{w} TRADING LLC" for w in _words(rng, SUPPLIERS)]
+    units = ["PCS", "CTN", "KG", "PKT"]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(["Item Code", "Item Bar Code", "Item Name", "Unit", "LP Supplier"])
+    barcodes = []
+    for i in range(rows):
+        if barcodes and rng.random() < duplicate_rate:
+            barcode = rng.choice(barcodes)
+        else:
+            barcode = 6290000000000 + rng.randrange(10_000_000_000)
+        barcodes.append(barcode)
+        name = " ".join(rng.choices(words, k=rng.randint(2, 5))) + f" {rng.randint(1, 999)}G"
+        ws.append([i + 1, barcode, name, rng.choice(units), rng.choice(suppliers)])
+    wb.save(path)
+    return barcodes
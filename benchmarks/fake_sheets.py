@@ -0,0 +1,59 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+
+class FakeSheetsConnection:
+    """
+    Local stand-in for the gsheets connection (same append/read calls).
+    Rows live in SQLite (in memory by default) and every call sleeps for the
+    injected latency, so benchmarks see realistic round-trip costs.
+    """
+
+    def __init__(self, path=":memory:", latency_ms=0.0, jitter_ms=0.0):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.append_calls = 0
+        self.read_calls = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (spreadsheet TEXT, row TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS headers (spreadsheet TEXT PRIMARY KEY, headers TEXT)")
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def append(self, spreadsheet, data, headers, worksheet=None):
+        self._wait()
+        spreadsheet = f"{spreadsheet}#{worksheet}" if worksheet else spreadsheet
+        with self._lock:
+            self.append_calls += 1
+            self._db.execute("INSERT OR IGNORE INTO headers VALUES (?, ?)", (spreadsheet, json.dumps(headers)))
+            self._db.executemany("INSERT INTO rows VALUES (?, ?)", [(spreadsheet, json.dumps(r)) for r in data])
+            self._db.commit()
+
+    def read(self, spreadsheet, ttl=None, skiprows=None, worksheet=None, **options):
+        self._wait()
+        spreadsheet = f"{spreadsheet}#{worksheet}" if worksheet else spreadsheet
+        offset = len(skiprows) if skiprows is not None else 0
+        with self._lock:
+            self.read_calls += 1
+            header = self._db.execute("SELECT headers FROM headers WHERE spreadsheet = ?", (spreadsheet,)).fetchone()
+            rows = self._db.execute(
+                "SELECT row FROM rows WHERE spreadsheet = ? ORDER BY rowid LIMIT -1 OFFSET ?",
+                (spreadsheet, offset),
+            ).fetchall()
+        if header is None:
+            return pd.DataFrame()
+        return pd.DataFrame([json.loads(r[0]) for r in rows], columns=json.loads(header[0]))
+
+    def row_count(self, spreadsheet):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM rows WHERE spreadsheet = ?", (spreadsheet,)).fetchone()[0]
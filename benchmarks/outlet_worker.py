@@ -0,0 +1,57 @@
+"""
+One outlet's headless session for the concurrent-outlets benchmark.
+Started by benchmarks.run: logs in, prints {"ready": ...}, waits for "go" on
+stdin, runs its search/add cycles and prints the timings as one JSON line.
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+import streamlit as st
+
+from benchmarks.fake_sheets import FakeSheetsConnection
+from benchmarks.run import new_session, search_and_add
+from write_queue import JOURNAL_PATH
+
+
+def main(config):
+    os.chdir(config["workdir"])
+    fake = FakeSheetsConnection(path=config["sheets_db"], latency_ms=config["latency_ms"],
+                                jitter_ms=config["jitter_ms"])
+    st.connections.SQLConnection = lambda *a, **k: fake
+    with open(config["barcodes"]) as f:
+        barcodes = json.load(f)
+    rng = random.Random(config["seed"])
+
+    try:
+        at = new_session(config["outlet"])
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), flush=True)
+        return
+    print(json.dumps({"ready": config["outlet"]}), flush=True)
+    sys.stdin.readline()
+
+    began, cycle = time.time(), []
+    try:
+        for _ in range(config["items"]):
+            search_ms, add_ms = search_and_add(at, rng.choice(barcodes))
+            cycle.append(search_ms + add_ms)
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), flush=True)
+        return
+    print(json.dumps({"cycle_ms": cycle, "began": began, "ended": time.time()}), flush=True)
+
+    # Stay up (the write queue thread lives in this process) until the journal drains.
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        with sqlite3.connect(JOURNAL_PATH, timeout=30) as journal:
+            if not journal.execute("SELECT COUNT(*) FROM journal").fetchone()[0]:
+                return
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    main(json.loads(sys.argv[1]))
@@ -0,0 +1,286 @@
+"""
+Benchmark and load test for the outlet dashboard.
+
+Runs against a synthetic catalog and a local FakeSheetsConnection (no Google
+Sheets access needed) and reports catalog load time, barcode/name lookup
+latency, per-rerun latency of the real app (driven headlessly through
+Streamlit's AppTest), write-queue append throughput, and every outlet
+submitting at once.
+
+    python -m benchmarks.run --rows 10000 100000 --latency-ms 150
+    python -m benchmarks.run --rows 1000000 --json bench.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.catalog_gen import write_catalog
+from benchmarks.fake_sheets import FakeSheetsConnection
+from catalog import CACHE_DIR, Catalog, load_catalog_frame
+from shared_catalog import attach_catalog, catalog_version, publish_catalog
+from write_queue import WriteQueue, new_record_id
+
+
+APP = os.path.join(ROOT, "report.py")
+SECRETS = {"inventory_sheet_url": "bench://inventory", "feedback_sheet_url": "bench://feedback"}
+OUTLETS = [
+    "Hilal", "Safa Super", "Azhar HP", "Azhar", "Blue Pearl", "Fida", "Hadeqat",
+    "Jais", "Sabah", "Sahat", "Shams salem", "Shams Liwan", "Superstore",
+    "Tay Tay", "Safa oudmehta", "Port saeed"
+]
+
+
+def summarize(samples_ms):
+    if not samples_ms:
+        return {}
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+    return {"n": len(ordered), "mean": round(statistics.fmean(ordered), 3),
+            "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": round(ordered[-1], 3)}
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def sample_item(rng, barcode, outlet):
+    return {
+        "Timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "Form Type": rng.choice(["Expiry", "Damages", "Near Expiry"]),
+        "Barcode": str(barcode),
+        "Item Name": "BENCH ITEM",
+        "Qty": rng.randint(1, 20),
+        "Cost": 1.5, "Selling": 2.0, "Amount": 3.0, "GP%": 33.33,
+        "Expiry": "01-Nov-26", "Supplier": "BENCH", "Remarks": "",
+        "Outlet": outlet, "Staff Name": "bench",
+        "Record ID": new_record_id(),
+    }
+
+
+def bench_catalog(path, barcodes, rng):
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    frame, cold_ms = timed(load_catalog_frame, path)
+    frame, warm_ms = timed(load_catalog_frame, path)
+    catalog, index_ms = timed(Catalog, frame)
+    version = catalog_version(path)
+    _, publish_ms = timed(publish_catalog, catalog, version)
+    _, attach_ms = timed(attach_catalog, version)
+
+    lookups = []
+    for _ in range(5000):
+        barcode = rng.choice(barcodes) if rng.random() < 0.8 else rng.randrange(10 ** 12)
+        query = rng.choice([str(barcode), f"0{barcode}", f"{barcode}.0", f" {barcode} "])
+        lookups.append(timed(catalog.lookup, query)[1])
+
+    names = catalog.frame["Item Name"].dropna().tolist()
+    searches = []
+    for _ in range(300):
+        name = rng.choice(names)
+        start = rng.randrange(max(1, len(name) - 8))
+        searches.append(timed(catalog.name_index.search, name[start:start + rng.randint(4, 12)])[1])
+
+    resolve_ms = timed(catalog.resolve, [str(b) for b in rng.sample(barcodes, min(500, len(barcodes)))])[1]
+    return {
+        "read_excel_cold_ms": round(cold_ms, 1),
+        "parquet_cache_warm_ms": round(warm_ms, 1),
+        "index_build_ms": round(index_ms, 1),
+        "shared_publish_ms": round(publish_ms, 1),
+        "shared_attach_ms": round(attach_ms, 1),
+        "barcode_lookup_ms": summarize(lookups),
+        "name_search_ms": summarize(searches),
+        "bulk_resolve_500_ms": round(resolve_ms, 2),
+    }
+
+
+def new_session(outlet="Hilal", timeout=600):
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.secrets["gsheets"] = SECRETS
+    at.run()
+    at.text_input[0].input("almadina")
+    at.selectbox[0].set_value(outlet)
+    at.text_input[1].input("123123")
+    at.button[0].click().run()
+    at.text_input(key="staff_name_input_key").input("bench").run()
+    return at
+
+
+def search_and_add(at, barcode):
+    """One full counter cycle: scan/search, then Add to List. Returns (search_ms, add_ms)."""
+    # AppTest can't type into the barcode component; hand it a submission as the frontend would.
+    at.session_state["lookup_barcode_input"] = {"barcode": str(barcode), "seq": time.time_ns()}
+    _, search_ms = timed(at.run)
+    add_button = next(b for b in at.button if "Add to List" in b.label)
+    _, add_ms = timed(add_button.click().run)
+    return search_ms, add_ms
+
+
+def bench_reruns(barcodes, rng, cycles):
+    at, login_ms = timed(new_session)
+    idle = [timed(at.run)[1] for _ in range(cycles)]
+    searches, adds = [], []
+    for _ in range(cycles):
+        search_ms, add_ms = search_and_add(at, rng.choice(barcodes))
+        searches.append(search_ms)
+        adds.append(add_ms)
+    idle_long_list = [timed(at.run)[1] for _ in range(cycles)]
+
+    at.sidebar.radio[0].set_value("View Saved Data")
+    view = [timed(at.run)[1] for _ in range(cycles)]
+    errors = [e.value for e in at.exception] + [e.value for e in at.error]
+    return {
+        "session_start_ms": round(login_ms, 1),
+        "dashboard_rerun_ms": summarize(idle),
+        "barcode_search_rerun_ms": summarize(searches),
+        "add_to_list_rerun_ms": summarize(adds),
+        f"dashboard_rerun_after_{cycles}_items_ms": summarize(idle_long_list),
+        "view_saved_data_rerun_ms": summarize(view),
+        "errors": errors,
+    }
+
+
+def bench_append_throughput(latency_ms, records, rng):
+    fake = FakeSheetsConnection(latency_ms=latency_ms)
+    journal = os.path.join(tempfile.mkdtemp(), "journal.sqlite3")
+    queue = WriteQueue(
+        lambda spreadsheet, rows, headers: fake.append(spreadsheet=spreadsheet, data=rows, headers=headers),
+        journal_path=journal,
+    )
+    enqueue = []
+    started = time.perf_counter()
+    for _ in range(records):
+        item = sample_item(rng, rng.randrange(10 ** 12), rng.choice(OUTLETS))
+        enqueue.append(timed(queue.enqueue, SECRETS["inventory_sheet_url"], item, item["Record ID"])[1])
+    while queue.stats()["depth"]:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    return {
+        "records": records,
+        "enqueue_ms": summarize(enqueue),
+        "drain_s": round(elapsed, 2),
+        "rows_per_s": round(records / elapsed, 1),
+        "sheet_append_calls": fake.append_calls,
+    }
+
+
+def bench_outlets(workdir, barcodes, args, fake):
+    """
+    Every outlet runs its own headless session in its own process (like
+    separate server workers; AppTest itself isn't thread-safe). Workers log
+    in, report ready, and all start submitting on the same "go".
+    """
+    barcode_file = os.path.join(workdir, "bench_barcodes.json")
+    with open(barcode_file, "w") as f:
+        json.dump([str(b) for b in barcodes], f)
+
+    before = fake.row_count(SECRETS["inventory_sheet_url"])
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.outlet_worker", json.dumps({
+                "workdir": workdir, "sheets_db": fake.path, "latency_ms": args.latency_ms,
+                "jitter_ms": args.jitter_ms, "outlet": outlet, "seed": i,
+                "barcodes": barcode_file, "items": args.items_per_outlet,
+            })],
+            cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        for i, outlet in enumerate(OUTLETS)
+    ]
+    ready = [json.loads(p.stdout.readline() or '{"error": "worker exited"}') for p in procs]
+    for p in procs:
+        p.stdin.write("go\n")
+        p.stdin.flush()
+
+    cycles, failures, began, ended = [], [], [], []
+    for outlet, p, setup in zip(OUTLETS, procs, ready):
+        result = setup if "error" in setup else json.loads(p.stdout.readline() or '{"error": "worker exited"}')
+        if "error" in result:
+            failures.append(f"{outlet}: {result['error']}")
+            continue
+        cycles.extend(result["cycle_ms"])
+        began.append(result["began"])
+        ended.append(result["ended"])
+
+    expected = before + len(began) * args.items_per_outlet
+    deadline = time.time() + 120
+    while fake.row_count(SECRETS["inventory_sheet_url"]) < expected and time.time() < deadline:
+        time.sleep(0.02)
+    in_sheet = time.time()
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+    first = min(began) if began else in_sheet
+    return {
+        "outlets": len(OUTLETS),
+        "items_per_outlet": args.items_per_outlet,
+        "cycle_ms": summarize(cycles),
+        "all_submitted_s": round(max(ended, default=first) - first, 2),
+        "all_in_sheet_s": round(in_sheet - first, 2),
+        "rows_in_sheet": fake.row_count(SECRETS["inventory_sheet_url"]) - before,
+        "failures": failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="catalog sizes to test")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="injected Sheets round-trip latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--cycles", type=int, default=20, help="search/add cycles per rerun benchmark")
+    parser.add_argument("--records", type=int, default=500, help="records for the append throughput run")
+    parser.add_argument("--items-per-outlet", type=int, default=5)
+    parser.add_argument("--skip-apptest", action="store_true", help="only run the in-process benchmarks")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    workdir = tempfile.mkdtemp(prefix="outlet-bench-")
+    os.chdir(workdir)
+    fake = FakeSheetsConnection(path=os.path.join(workdir, "sheets.sqlite3"),
+                                latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    st.connections.SQLConnection = lambda *a, **k: fake
+
+    rng = random.Random(1)
+    report = {"latency_ms": args.latency_ms, "sizes": {}}
+    for rows in args.rows:
+        print(f"== catalog {rows:,} rows ({workdir})", flush=True)
+        barcodes, gen_ms = timed(write_catalog, "alllist.xlsx", rows)
+        result = {"generate_xlsx_ms": round(gen_ms, 1), "catalog": bench_catalog("alllist.xlsx", barcodes, rng)}
+        if not args.skip_apptest:
+            st.cache_resource.clear()
+            st.cache_data.clear()
+            result["reruns"] = bench_reruns(barcodes, rng, args.cycles)
+            result["outlets_concurrent"] = bench_outlets(workdir, barcodes, args, fake)
+        report["sizes"][rows] = result
+        print(json.dumps(result, indent=2), flush=True)
+
+    report["append_throughput"] = bench_append_throughput(args.latency_ms, args.records, rng)
+    print("== append throughput")
+    print(json.dumps(report["append_throughput"], indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from catalog import NAME_COL, SUPPLIER_COL
+from write_queue import new_record_id
+
+
+BULK_COLUMNS = ["Barcode", "Qty", "Expiry", "Cost", "Selling", "Remarks"]
+
+_ALIASES = {
+    "barcode": "Barcode", "item bar code": "Barcode", "bar code": "Barcode",
+    "qty": "Qty", "quantity": "Qty", "qty [pcs]": "Qty",
+    "expiry": "Expiry", "expiry date": "Expiry",
+    "cost": "Cost",
+    "selling": "Selling", "selling price": "Selling",
+    "remarks": "Remarks",
+}
+
+
+def _separator(lines):
+    """
+    Tab if any line has one; comma if one appears before the remarks, i.e.
+    within a line's first five space-separated fields; otherwise None (space
+    separated, or a single column). A comma inside the remarks of a space
+    separated line doesn't count:
+
+    >>> _separator(["6291234567890 2 2026-11-01 1.5 2 torn, box"]) is None
+    True
+    """
+    if any("\t" in line for line in lines):
+        return "\t"
+    leading = len(BULK_COLUMNS) - 1
+    if any("," in " ".join(line.split(None, leading)[:leading]) for line in lines):
+        return ","
+    return None
+
+
+def _read_text(text):
+    # Picked from the text itself: the CSV sniffer guesses a digit or letter
+    # as the separator on one-column input (a barcode per line).
+    lines = [line for line in text.splitlines() if line.strip()]
+    sep = _separator(lines)
+    if sep is not None:
+        return pd.read_csv(io.StringIO(text), sep=sep, dtype=str, header=None, skip_blank_lines=True)
+    # Remarks keep their spaces.
+    return pd.DataFrame([line.split(None, len(BULK_COLUMNS) - 1) for line in lines], dtype=str)
+
+
+def parse_bulk_rows(source):
+    """
+    Reads pasted text (tab, comma or space separated, with or without a
+    header row) or an uploaded .csv/.xlsx file into the bulk columns, all as
+    strings. Headerless input is read positionally as barcode, qty, expiry,
+    cost, selling, remarks; one barcode per line is read as is:
+
+    >>> parse_bulk_rows("6291234567890\\n6291234567891")["Barcode"].tolist()
+    ['6291234567890', '6291234567891']
+    """
+    name = getattr(source, "name", "")
+    if name.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(source, dtype=str, header=None)
+    else:
+        text = source if isinstance(source, str) else source.getvalue().decode("utf-8-sig")
+        if not text.strip():
+            return pd.DataFrame(columns=BULK_COLUMNS)
+        df = _read_text(text)
+
+    df = df.dropna(how="all")
+    if df.empty:
+        return pd.DataFrame(columns=BULK_COLUMNS)
+    first = df.iloc[0].fillna("").astype(str).str.strip().str.lower()
+    if first.isin(_ALIASES.keys()).any():
+        df.columns = [_ALIASES.get(c, c) for c in first]
+        df = df.iloc[1:]
+    else:
+        df = df.iloc[:, :len(BULK_COLUMNS)]
+        df.columns = BULK_COLUMNS[:df.shape[1]]
+
+    df = df.reindex(columns=BULK_COLUMNS)
+    df["Barcode"] = df["Barcode"].fillna("").astype(str).str.strip()
+    df["Remarks"] = df["Remarks"].fillna("").astype(str).str.strip()
+    return df[df["Barcode"] != ""].reset_index(drop=True)
+
+
+def _parse_dates(col):
+    """ISO dates first; anything else (01-Nov-26, 01/11/2026) is read day-first."""
+    parsed = pd.to_datetime(col, format="ISO8601", errors="coerce")
+    rest = parsed.isna() & col.notna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(col[rest], format="mixed", dayfirst=True, errors="coerce")
+    return parsed
+
+
+def resolve_bulk_rows(rows, catalog):
+    """
+    Joins the batch against the catalog in one pass and types the numeric
+    columns. Missing or unreadable Qty, Cost, Selling and Expiry cells stay
+    blank for the user to fill in; they are not defaulted.
+    """
+    resolved = catalog.resolve(rows["Barcode"])
+    batch = pd.DataFrame({
+        "Barcode": rows["Barcode"].to_numpy(),
+        "Item Name": resolved[NAME_COL].astype("string").fillna("").to_numpy(),
+        "Supplier": resolved[SUPPLIER_COL].astype("string").fillna("").to_numpy(),
+        "Qty": pd.to_numeric(rows["Qty"], errors="coerce").round().clip(lower=1).astype("Int64").array,
+        "Expiry": _parse_dates(rows["Expiry"]).dt.date.to_numpy(),
+        "Cost": pd.to_numeric(rows["Cost"], errors="coerce").to_numpy(),
+        "Selling": pd.to_numeric(rows["Selling"], errors="coerce").to_numpy(),
+        "Remarks": rows["Remarks"].to_numpy(),
+    })
+    batch.insert(1, "Found", batch["Item Name"] != "")
+    return with_bulk_totals(batch)
+
+
+def with_bulk_totals(batch):
+    """(Re)computes Amount and GP% column-wise."""
+    batch = batch.copy()
+    cost = batch["Cost"].astype(float)
+    selling = batch["Selling"].astype(float)
+    batch["Amount"] = (cost * batch["Qty"]).round(2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        batch["GP%"] = np.where(cost != 0, (selling - cost) / cost * 100, 0.0).round(2)
+    return batch
+
+
+def build_bulk_records(batch, form_type, outlet_name, staff_name):
+    """Turns an edited batch into sheet records with the same columns as single entries."""
+    batch = with_bulk_totals(batch)
+    if form_type == "Damages":
+        expiry = pd.Series("", index=batch.index)
+    else:
+        expiry = pd.to_datetime(batch["Expiry"], errors="coerce").dt.strftime("%d-%b-%y").fillna("")
+    records = pd.DataFrame({
+        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "Form Type": form_type,
+        "Barcode": batch["Barcode"].astype(str).str.strip(),
+        "Item Name": batch["Item Name"].astype(str).str.strip(),
+        "Qty": batch["Qty"].astype(int),
+        "Cost": batch["Cost"].astype(float).round(2),
+        "Selling": batch["Selling"].astype(float).round(2),
+        "Amount": batch["Amount"],
+        "GP%": batch["GP%"],
+        "Expiry": expiry,
+        "Supplier": batch["Supplier"].astype(str).str.strip(),
+        "Remarks": batch["Remarks"].astype(str).str.strip(),
+        "Outlet": outlet_name,
+        "Staff Name": staff_name.strip(),
+        "Record ID": [new_record_id() for _ in range(len(batch))],
+    })
+    return records.to_dict("records")
@@ -0,0 +1,343 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+
+BARCODE_COL = "Item Bar Code"
+NAME_COL = "Item Name"
+SUPPLIER_COL = "LP Supplier"
+REQUIRED_COLS = [BARCODE_COL, NAME_COL, SUPPLIER_COL]
+
+CACHE_DIR = ".catalog_cache"
+
+_FLOAT_ARTIFACT = re.compile(r"\.0+$")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_barcode(barcode):
+    """
+    Returns the canonical GTIN key for a scanned or typed barcode.
+    Strips whitespace and Excel float artifacts ("6291234.0") and drops leading
+    zeros so UPC-A, EAN-13 and GTIN-14 forms of the same code compare equal.
+    """
+    if barcode is None:
+        return ""
+    if isinstance(barcode, float):
+        if barcode != barcode:
+            return ""
+        if barcode.is_integer():
+            barcode = int(barcode)
+    key = _FLOAT_ARTIFACT.sub("", str(barcode).strip())
+    if key.isdigit():
+        return key.lstrip("0") or "0"
+    return key.upper()
+
+
+def normalize_barcode_column(col):
+    """Vectorized normalize_barcode for a whole catalog column."""
+    if pd.api.types.is_float_dtype(col):
+        col = col.astype("Int64")
+    keys = col.astype("string").str.strip().str.replace(_FLOAT_ARTIFACT, "", regex=True)
+    numeric = keys.str.fullmatch(r"\d+").fillna(False).astype(bool)
+    keys = keys.where(~numeric, keys.str.lstrip("0").replace("", "0"))
+    keys = keys.where(numeric, keys.str.upper())
+    return keys.fillna("")
+
+
+def compact_catalog_frame(df):
+    """
+    Keeps only the columns the app uses, with compact dtypes.
+    Raises KeyError naming the first required column that is missing.
+    """
+    df.columns = df.columns.str.strip()
+    for col in REQUIRED_COLS:
+        if col not in df.columns:
+            raise KeyError(col)
+    df = df[REQUIRED_COLS].copy()
+    barcodes = df[BARCODE_COL]
+    if pd.api.types.is_float_dtype(barcodes):
+        barcodes = barcodes.astype("Int64")
+    df[BARCODE_COL] = barcodes.astype("string")
+    df[NAME_COL] = df[NAME_COL].astype("string")
+    df[SUPPLIER_COL] = df[SUPPLIER_COL].astype("string").astype("category")
+    return df.reset_index(drop=True)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(path, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return (os.path.join(cache_dir, f"{stem}.parquet"),
+            os.path.join(cache_dir, f"{stem}.json"))
+
+
+def _write_cache(df, meta, data_path, meta_path):
+    os.makedirs(os.path.dirname(data_path) or ".", exist_ok=True)
+    tmp_data, tmp_meta = data_path + ".tmp", meta_path + ".tmp"
+    df.to_parquet(tmp_data, index=False)
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_data, data_path)
+    os.replace(tmp_meta, meta_path)
+
+
+def load_catalog_frame(path, cache_dir=CACHE_DIR):
+    """
+    Loads the item master, preferring the compiled Parquet cache.
+    The xlsx is only re-parsed when its mtime/size changed and its sha256 no
+    longer matches the one the cache was built from.
+    """
+    stat = os.stat(path)
+    data_path, meta_path = _cache_paths(path, cache_dir)
+    meta = {}
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    digest = None
+    fresh = meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size
+    if not fresh and meta.get("sha256"):
+        digest = _file_digest(path)
+        fresh = meta["sha256"] == digest
+
+    if fresh:
+        try:
+            df = pd.read_parquet(data_path)
+        except (OSError, ValueError):
+            df = None
+        if df is not None:
+            if meta.get("mtime_ns") != stat.st_mtime_ns:
+                meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                try:
+                    with open(meta_path, "w") as f:
+                        json.dump(meta, f)
+                except OSError:
+                    pass
+            return df
+
+    df = compact_catalog_frame(pd.read_excel(path))
+    meta = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest or _file_digest(path),
+        "rows": len(df),
+    }
+    try:
+        _write_cache(df, meta, data_path, meta_path)
+    except OSError:
+        pass
+    return df
+
+
+def _encode_keys(keys):
+    """Canonical keys as fixed-width UTF-8 bytes (searchsorted works on these in place)."""
+    encoded = [k.encode() for k in keys]
+    return np.array(encoded, dtype=f"S{max(1, max(map(len, encoded), default=1))}")
+
+
+class BarcodeIndex:
+    """
+    Canonical barcode -> catalog rows as two flat arrays: the sorted keys and
+    the row positions in that order (duplicates keep every row, in file order).
+    Flat arrays rather than a dict so a published copy can be memory-mapped.
+    """
+
+    def __init__(self, keys, order):
+        self.keys = keys
+        self.order = order
+
+    @classmethod
+    def build(cls, df):
+        if df.empty:
+            return cls(np.array([], dtype="S1"), np.array([], dtype=np.int32))
+        keys = _encode_keys(normalize_barcode_column(df[BARCODE_COL]).tolist())
+        order = np.argsort(keys, kind="stable").astype(np.int32)
+        return cls(keys[order], order)
+
+    def positions(self, key):
+        """Row positions for one canonical key (empty array on a miss)."""
+        if not key:
+            return self.order[0:0]
+        needle = key.encode()
+        lo = np.searchsorted(self.keys, needle, side="left")
+        hi = np.searchsorted(self.keys, needle, side="right")
+        return self.order[lo:hi]
+
+    def first_positions(self, keys):
+        """First row position per canonical key, -1 where not found."""
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        needles = _encode_keys(keys)
+        slots = np.minimum(np.searchsorted(self.keys, needles), len(self.keys) - 1)
+        found = (self.keys[slots] == needles) & (needles != b"")
+        return np.where(found, self.order[slots], -1)
+
+
+def build_barcode_index(df):
+    return BarcodeIndex.build(df)
+
+
+def _search_text(text):
+    return _NON_WORD.sub(" ", str(text).lower()).strip()
+
+
+def _trigram_codes(data):
+    """Packs every 3-byte window of a uint8 array into one int per window."""
+    data = data.astype(np.int64)
+    return (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+
+
+def name_pairs(names, suppliers):
+    """The distinct, non-blank (Item Name, LP Supplier) pairs the name index is built over."""
+    pairs = pd.DataFrame({
+        NAME_COL: pd.Series(names, dtype="string").fillna("").str.strip(),
+        SUPPLIER_COL: pd.Series(suppliers, dtype="string").fillna("").str.strip(),
+    })
+    return pairs[pairs[NAME_COL] != ""].drop_duplicates(ignore_index=True)
+
+
+class NameIndex:
+    """
+    Trigram index over the distinct (Item Name, LP Supplier) pairs.
+    Built with numpy over one byte buffer (no per-row Python loop); matching
+    counts shared trigrams with one bincount over the posting lists, so it
+    tolerates typos and partial words. Name prefixes rank first.
+    Postings are kept CSR-style (sorted grams, offsets, doc ids) so a
+    published copy can be memory-mapped.
+    """
+
+    def __init__(self, names, suppliers):
+        self.pairs = pairs = name_pairs(names, suppliers)
+        names = (pairs[NAME_COL].str.lower().str.replace(_NON_WORD, " ", regex=True)
+                 .str.strip().tolist())
+        suppliers = (pairs[SUPPLIER_COL].str.lower().str.replace(_NON_WORD, " ", regex=True)
+                     .str.strip().tolist())
+
+        docs = [f" {n} {s} ".encode() for n, s in zip(names, suppliers)]
+        self.grams = np.array([], dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.docs = np.array([], dtype=np.int32)
+        if not docs:
+            return
+        lengths = np.fromiter((len(d) for d in docs), dtype=np.int64, count=len(docs))
+        data = np.frombuffer(b"".join(docs), dtype=np.uint8)
+        codes = _trigram_codes(data)
+        doc_ids = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)[:-2]
+        ends = np.repeat(np.cumsum(lengths), lengths)[:-2]
+        inside = np.arange(len(codes)) + 3 <= ends
+        keys = np.sort((codes[inside] << 32) | doc_ids[inside])
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+        gram_of_key = keys >> 32
+        starts = np.flatnonzero(np.concatenate(([True], gram_of_key[1:] != gram_of_key[:-1])))
+        self.grams = gram_of_key[starts]
+        self.offsets = np.append(starts, len(keys))
+        self.docs = (keys & 0xFFFFFFFF).astype(np.int32)
+
+    @classmethod
+    def from_arrays(cls, pairs, grams, offsets, docs):
+        """Wraps already-built postings (e.g. memory-mapped from a published catalog)."""
+        index = cls.__new__(cls)
+        index.pairs, index.grams, index.offsets, index.docs = pairs, grams, offsets, docs
+        return index
+
+    def _posting(self, gram):
+        i = np.searchsorted(self.grams, gram)
+        if i == len(self.grams) or self.grams[i] != gram:
+            return None
+        return self.docs[self.offsets[i]:self.offsets[i + 1]]
+
+    def search(self, query, limit=10, min_score=0.3):
+        """Returns up to `limit` ranked (Item Name, LP Supplier, Score) suggestions."""
+        text = _search_text(query)
+        grams = set(_trigram_codes(np.frombuffer(f" {text}".encode(), dtype=np.uint8)).tolist()) if text else set()
+        hits = [posting for posting in map(self._posting, grams) if posting is not None]
+        if not hits:
+            return self.pairs.iloc[0:0].assign(Score=pd.Series(dtype=float))
+
+        counts = np.bincount(np.concatenate(hits), minlength=len(self.pairs))
+        pool = min(len(counts), limit * 5)
+        candidates = np.argpartition(-counts, pool - 1)[:pool]
+        scores = counts[candidates] / len(grams)
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+
+        names = {doc: _search_text(self.pairs[NAME_COL].iat[doc]) for doc in candidates.tolist()}
+        ranked = sorted(
+            zip(candidates.tolist(), scores.tolist()),
+            key=lambda c: (-c[1], not names[c[0]].startswith(text), len(names[c[0]])),
+        )[:limit]
+        result = self.pairs.iloc[[doc for doc, _ in ranked]].copy()
+        result["Score"] = [round(score, 2) for _, score in ranked]
+        return result.reset_index(drop=True)
+
+
+class Catalog:
+    """The loaded item master plus the lookup structures built from it."""
+
+    def __init__(self, frame, barcode_index=None, name_index=None, version=None):
+        self.frame = frame
+        self.barcode_index = barcode_index if barcode_index is not None else build_barcode_index(frame)
+        self.name_index = name_index if name_index is not None else NameIndex(
+            frame[NAME_COL] if not frame.empty else [],
+            frame[SUPPLIER_COL] if not frame.empty else [],
+        )
+        self.version = version
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def lookup(self, barcode):
+        """Returns every catalog row for a barcode (empty frame on a miss)."""
+        return self.frame.iloc[self.barcode_index.positions(normalize_barcode(barcode))]
+
+    def resolve(self, barcodes):
+        """
+        Vectorized lookup for a batch: returns Item Name/LP Supplier aligned to
+        `barcodes` (first catalog row per barcode, NA where not found).
+        """
+        if self.frame.empty:
+            return pd.DataFrame({NAME_COL: pd.NA, SUPPLIER_COL: pd.NA}, index=pd.RangeIndex(len(barcodes)))
+        keys = normalize_barcode_column(pd.Series(barcodes, dtype="object"))
+        first = self.barcode_index.first_positions(keys.tolist())
+        found = first >= 0
+        resolved = self.frame.iloc[np.where(found, first, 0)][[NAME_COL, SUPPLIER_COL]].reset_index(drop=True)
+        return resolved.where(pd.Series(found), pd.NA)
+
+
+def _first_by_key(frame):
+    keyed = frame[[NAME_COL, SUPPLIER_COL]].astype("string").fillna("")
+    keyed.index = normalize_barcode_column(frame[BARCODE_COL]).to_numpy()
+    return keyed[keyed.index != ""].groupby(level=0, sort=False).first()
+
+
+def diff_catalogs(old, new):
+    """
+    Counts canonical barcodes added, removed, and changed (first row's name or
+    supplier differs) between two catalog frames, plus the row delta.
+    """
+    if old.empty or new.empty:
+        before, after = (0 if old.empty else len(_first_by_key(old))), (0 if new.empty else len(_first_by_key(new)))
+        return {"added": after, "removed": before, "changed": 0, "rows": len(new) - len(old)}
+    before, after = _first_by_key(old), _first_by_key(new)
+    common = before.index.intersection(after.index)
+    changed = (before.loc[common] != after.loc[common]).any(axis=1)
+    return {
+        "added": len(after.index.difference(before.index)),
+        "removed": len(before.index.difference(after.index)),
+        "changed": int(changed.sum()),
+        "rows": len(new) - len(old),
+    }
@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from analytics import INVENTORY_COLUMNS, typed_frame
+from sheet_index import SheetIndex
+
+
+EXPIRY_FORMS = ("Expiry", "Near Expiry")
+
+DETAIL_COLUMNS = ["expiry", "outlet", "form_type", "barcode", "item_name", "qty", "amount", "supplier", "staff"]
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _day(value):
+    return (value - _EPOCH).days
+
+
+class _OutletRun:
+    """One outlet's entries sorted by expiry day, with prefix sums for O(1) range totals."""
+
+    def __init__(self):
+        self.days = np.array([], dtype=np.int32)
+        self.rows = np.array([], dtype=np.int64)
+        self.qty = np.array([])
+        self.amount = np.array([])
+        self.qty_cum = np.zeros(1)
+        self.amount_cum = np.zeros(1)
+
+    def merge(self, days, rows, qty, amount):
+        order = np.argsort(np.concatenate([self.days, days]), kind="stable")
+        self.days = np.concatenate([self.days, days])[order]
+        self.rows = np.concatenate([self.rows, rows])[order]
+        self.qty = np.concatenate([self.qty, qty])[order]
+        self.amount = np.concatenate([self.amount, amount])[order]
+        self.qty_cum = np.concatenate([[0.0], np.cumsum(self.qty)])
+        self.amount_cum = np.concatenate([[0.0], np.cumsum(self.amount)])
+
+    def span(self, first_day, last_day):
+        lo = np.searchsorted(self.days, first_day, side="left")
+        hi = np.searchsorted(self.days, last_day, side="right")
+        return lo, hi
+
+
+class ExpiryIndex(SheetIndex):
+    """
+    Saved Expiry/Near Expiry records indexed by parsed expiry date: per
+    outlet, a sorted day array plus prefix sums of Qty and Amount. A range
+    query is two binary searches per outlet, and its totals are two prefix
+    sum lookups, whatever the history size.
+    """
+
+    def _reset(self):
+        super()._reset()
+        self._runs = {}
+        self._detail = pd.DataFrame(columns=DETAIL_COLUMNS)
+
+    def _index(self, rows):
+        typed = typed_frame(rows, INVENTORY_COLUMNS)
+        typed = typed[typed["form_type"].isin(EXPIRY_FORMS) & typed["expiry"].notna()]
+        if typed.empty:
+            return 0
+        new = typed[DETAIL_COLUMNS].reset_index(drop=True)
+        new["outlet"] = new["outlet"].fillna("")
+        new["qty"] = new["qty"].fillna(0.0)
+        new["amount"] = new["amount"].fillna(0.0)
+        start = len(self._detail)
+        self._detail = new if self._detail.empty else pd.concat([self._detail, new], ignore_index=True)
+
+        days = pd.to_datetime(new["expiry"]).to_numpy().astype("datetime64[D]").astype(np.int32)
+        rows = np.arange(start, start + len(new), dtype=np.int64)
+        for outlet, positions in new.groupby("outlet", sort=False).indices.items():
+            run = self._runs.setdefault(outlet, _OutletRun())
+            run.merge(days[positions], rows[positions],
+                      new["qty"].to_numpy(dtype=float)[positions],
+                      new["amount"].to_numpy(dtype=float)[positions])
+        return len(new)
+
+    def expiring(self, days=7, outlets=None, today=None, with_detail=True):
+        """
+        Entries expiring from `today` through `today + days`, per outlet or
+        chain-wide (outlets=None). Returns (totals per outlet, detail rows);
+        detail is None when `with_detail` is False (totals alone are O(outlets)).
+        """
+        today = today or date.today()
+        first, last = _day(today), _day(today + timedelta(days=days))
+        with self._lock:
+            names = self._runs.keys() if not outlets else [o for o in outlets if o in self._runs]
+            totals, picked = [], []
+            for outlet in names:
+                run = self._runs[outlet]
+                lo, hi = run.span(first, last)
+                if hi == lo:
+                    continue
+                totals.append({
+                    "outlet": outlet,
+                    "items": int(hi - lo),
+                    "qty": float(run.qty_cum[hi] - run.qty_cum[lo]),
+                    "amount": round(float(run.amount_cum[hi] - run.amount_cum[lo]), 2),
+                    "first_expiry": _EPOCH + timedelta(days=int(run.days[lo])),
+                })
+                if with_detail:
+                    picked.append(run.rows[lo:hi])
+            detail = None
+            if with_detail:
+                detail = self._detail.iloc[np.concatenate(picked)] if picked else self._detail.iloc[0:0]
+
+        totals = pd.DataFrame(totals, columns=["outlet", "items", "qty", "amount", "first_expiry"])
+        totals = totals.sort_values("amount", ascending=False, ignore_index=True)
+        if detail is not None:
+            detail = detail.sort_values(["expiry", "outlet"], ignore_index=True)
+        return totals, detail
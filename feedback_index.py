@@ -0,0 +1,224 @@
+import math
+import re
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from analytics import FEEDBACK_COLUMNS, typed_frame
+from sheet_index import SheetIndex
+
+
+DETAIL_COLUMNS = ["ts", "outlet", "customer", "rating", "feedback"]
+# Sheet headers for the result columns.
+DETAIL_HEADERS = {**{name: header for header, (name, _) in FEEDBACK_COLUMNS.items()}, "score": "Relevance"}
+
+# A prefix term (`deliver*`) stops expanding after this many vocabulary words.
+MAX_PREFIX_TERMS = 64
+
+_TOKEN = re.compile(r"[^\W_]+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+_NO_DAY = np.iinfo(np.int64).min
+
+
+def tokenize(text):
+    """Lower-cased words: runs of letters and digits in any script."""
+    return _TOKEN.findall(text.casefold()) if text else []
+
+
+def parse_query(query):
+    """
+    Every query word is a required term; "quoted words" must also appear
+    side by side in that order, and a trailing * (`deliver*`) matches any
+    word starting so. Returns (terms, phrases).
+    """
+    terms, phrases = [], []
+    for quoted, word in _QUERY.findall(query or ""):
+        tokens = tokenize(quoted or word)
+        if not tokens:
+            continue
+        if not quoted and word.endswith("*") and len(tokens) == 1:
+            terms.append(tokens[0] + "*")
+            continue
+        terms.extend(tokens)
+        if len(tokens) > 1:
+            phrases.append(tokens)
+    return list(dict.fromkeys(terms)), phrases
+
+
+def _has_phrase(tokens, phrase):
+    first, width = phrase[0], len(phrase)
+    start = 0
+    while True:
+        try:
+            start = tokens.index(first, start)
+        except ValueError:
+            return False
+        if tokens[start:start + width] == phrase:
+            return True
+        start += 1
+
+
+class FeedbackIndex(SheetIndex):
+    """
+    Inverted index over the Feedback text of saved customer feedback: per
+    word, the ascending ids of the responses using it and how often, plus
+    each response's word sequence for phrase checks. Queries AND their terms
+    over the postings, filter by outlet, rating and date on per-response
+    arrays, and rank with BM25, so a search never re-reads the sheet.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def _reset(self):
+        super()._reset()
+        self._term_ids = {}
+        self._vocab = []
+        self._sorted_vocab = None
+        self._postings = []      # term id -> array of response ids (ascending)
+        self._freqs = []         # term id -> array of counts, parallel to _postings
+        self._tokens = []        # response id -> array of term ids, in text order
+        self._lengths = array("I")
+        self._outlet_codes = {}
+        self._outlets = array("i")
+        self._days = array("q")
+        self._ratings = array("d")
+        self._columns = None
+        self._detail = pd.DataFrame(columns=DETAIL_COLUMNS)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _index(self, rows):
+        typed = typed_frame(rows, FEEDBACK_COLUMNS)
+        new = typed[DETAIL_COLUMNS].reset_index(drop=True)
+        if new.empty:
+            return 0
+        new["outlet"] = new["outlet"].fillna("")
+
+        first = len(self._tokens)
+        for doc, text in enumerate(new["feedback"].fillna("").tolist(), start=first):
+            self._add(doc, text)
+        for outlet in new["outlet"].tolist():
+            self._outlets.append(self._outlet_codes.setdefault(outlet, len(self._outlet_codes)))
+        self._days.extend(new["ts"].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64).tolist())
+        self._ratings.extend(new["rating"].astype(float).fillna(np.nan).tolist())
+        self._detail = new if self._detail.empty else pd.concat([self._detail, new], ignore_index=True)
+        self._columns = None
+        return len(new)
+
+    def _add(self, doc, text):
+        ids, counts = array("I"), {}
+        for token in tokenize(text):
+            term = self._term_ids.get(token)
+            if term is None:
+                term = self._term_ids[token] = len(self._vocab)
+                self._vocab.append(token)
+                self._postings.append(array("I"))
+                self._freqs.append(array("H"))
+                self._sorted_vocab = None
+            ids.append(term)
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self._postings[term].append(doc)
+            self._freqs[term].append(min(count, 0xFFFF))
+        self._tokens.append(ids)
+        self._lengths.append(len(ids))
+
+    def _arrays(self):
+        # numpy copies of the per-response columns, rebuilt after each sync.
+        if self._columns is None:
+            self._columns = {
+                "lengths": np.array(self._lengths, dtype=np.float64),
+                "outlets": np.array(self._outlets),
+                "days": np.array(self._days),
+                "ratings": np.array(self._ratings),
+            }
+        return self._columns
+
+    def _expand(self, term):
+        if not term.endswith("*"):
+            term_id = self._term_ids.get(term)
+            return [] if term_id is None else [term_id]
+        if self._sorted_vocab is None:
+            self._sorted_vocab = sorted(self._vocab)
+        prefix, words = term[:-1], []
+        for i in range(bisect_left(self._sorted_vocab, prefix), len(self._sorted_vocab)):
+            word = self._sorted_vocab[i]
+            if not word.startswith(prefix) or len(words) == MAX_PREFIX_TERMS:
+                break
+            words.append(self._term_ids[word])
+        return words
+
+    def _postings_for(self, term, size):
+        """Dense per-response term counts for one query term (summed over a prefix's words)."""
+        counts = np.zeros(size)
+        for term_id in self._expand(term):
+            # A word's postings hold each response once, so plain fancy-index adds are safe.
+            counts[np.array(self._postings[term_id])] += np.array(self._freqs[term_id])
+        return counts
+
+    def search(self, query, outlets=None, min_rating=None, max_rating=None, start=None, end=None, limit=100):
+        """
+        Feedback containing every term and phrase of `query` within the
+        filters, best BM25 score first and newest first on ties. Returns
+        (the top `limit` rows with a score column, how many matched in all).
+        """
+        empty = pd.DataFrame(columns=DETAIL_COLUMNS + ["score"])
+        terms, phrases = parse_query(query)
+        if not terms:
+            return empty, 0
+
+        with self._lock:
+            size = len(self._tokens)
+            if not size:
+                return empty, 0
+            columns = self._arrays()
+            lengths = columns["lengths"]
+            norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+
+            keep = np.ones(size, dtype=bool)
+            scores = np.zeros(size)
+            for term in terms:
+                tf = self._postings_for(term, size)
+                found = tf > 0
+                matches = int(found.sum())
+                if not matches:
+                    return empty, 0
+                keep &= found
+                idf = math.log(1 + (size - matches + 0.5) / (matches + 0.5))
+                scores += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            if outlets:
+                codes = [self._outlet_codes[o] for o in outlets if o in self._outlet_codes]
+                keep &= np.isin(columns["outlets"], codes)
+            if min_rating is not None:
+                keep &= columns["ratings"] >= min_rating
+            if max_rating is not None:
+                keep &= columns["ratings"] <= max_rating
+            days = columns["days"]
+            if start is not None or end is not None:
+                keep &= days != _NO_DAY
+            if start is not None:
+                keep &= days >= (pd.Timestamp(start) - pd.Timestamp(0)).days
+            if end is not None:
+                keep &= days <= (pd.Timestamp(end) - pd.Timestamp(0)).days
+
+            docs = np.flatnonzero(keep)
+            if phrases and len(docs):
+                wanted = []
+                for phrase in phrases:
+                    ids = [self._term_ids.get(token) for token in phrase]
+                    if None in ids:
+                        return empty, 0
+                    wanted.append(array("I", ids))
+                docs = np.array([d for d in docs.tolist()
+                                 if all(_has_phrase(self._tokens[d], p) for p in wanted)], dtype=np.int64)
+
+            order = np.lexsort((-days[docs], -scores[docs]))[:limit]
+            top = docs[order]
+            rows = self._detail.iloc[top].reset_index(drop=True)
+        rows["score"] = np.round(scores[top], 2)
+        return rows, len(docs)
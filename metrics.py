@@ -0,0 +1,104 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is +Inf.
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q):
+        """Estimates a quantile by interpolating inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS_MS[i - 1] if i else 0.0
+                upper = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class Metrics:
+    """
+    Process-wide timing histograms keyed on (span, outlet, page).
+    Cheap enough for hot paths: one perf_counter pair and a bisect per span.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, span, ms, outlet="", page=""):
+        key = (span, outlet or "", page or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(ms)
+
+    @contextmanager
+    def span(self, name, outlet="", page=""):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000, outlet, page)
+
+    def summary(self):
+        """One row per (span, outlet, page) with count and p50/p95/p99 in ms."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            return [
+                {
+                    "span": span, "outlet": outlet, "page": page, "count": h.count,
+                    "p50_ms": round(h.quantile(0.50), 1),
+                    "p95_ms": round(h.quantile(0.95), 1),
+                    "p99_ms": round(h.quantile(0.99), 1),
+                    "max_ms": round(h.max, 1),
+                    "mean_ms": round(h.sum / h.count, 1) if h.count else 0.0,
+                }
+                for (span, outlet, page), h in items
+            ]
+
+    def to_json(self):
+        return json.dumps({"started_at": self.started_at, "exported_at": time.time(),
+                           "spans": self.summary()}, indent=2)
+
+    def to_prometheus(self, prefix="outlet_dashboard_span_duration_ms"):
+        """Prometheus text exposition format (cumulative buckets, _sum and _count)."""
+        lines = [f"# HELP {prefix} Duration of instrumented code paths in milliseconds.",
+                 f"# TYPE {prefix} histogram"]
+        with self._lock:
+            for (span, outlet, page), h in sorted(self._histograms.items()):
+                labels = f'span="{_escape(span)}",outlet="{_escape(outlet)}",page="{_escape(page)}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS_MS + ["+Inf"], h.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_sum{{{labels}}} {h.sum:.3f}")
+                lines.append(f"{prefix}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,22 +1,196 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import time
+from concurrent.futures import as_completed
+
+from analytics import EXPORT_FORMATS, INVENTORY_COLUMNS, LOSS_GROUPS, RecordsEngine
+from barcode_input import barcode_input
+from bulk_entry import build_bulk_records, parse_bulk_rows, resolve_bulk_rows, with_bulk_totals
+from catalog import Catalog
+from expiry_index import ExpiryIndex
+from feedback_index import DETAIL_HEADERS as FEEDBACK_DETAIL_HEADERS, FeedbackIndex
+from metrics import Metrics
+from session_buffer import FEEDBACK_BUFFER_SCHEMA, ITEM_BUFFER_SCHEMA, RecordBuffer
+from rollups import ROLLUP_PATH, RollupStore
+from shared_catalog import SharedCatalog
+from sheet_cache import SheetCache
+from storage import GoogleSheetsBackend, SQLiteBackend
+from write_queue import WriteQueue, new_record_id
 
 
 st.set_page_config(page_title="Outlet & Feedback Dashboard", layout="wide")
+rerun_started = time.perf_counter()
+
+outlets = [
+    "Hilal", "Safa Super", "Azhar HP", "Azhar", "Blue Pearl", "Fida", "Hadeqat",
+    "Jais", "Sabah", "Sahat", "Shams salem", "Shams Liwan", "Superstore",
+    "Tay Tay", "Safa oudmehta", "Port saeed"
+]
+
+
+@st.cache_resource
+def get_metrics():
+    return Metrics()
+
+metrics = get_metrics()
+
+def connect_sheets():
+    """Opens a new gsheets client for the backend pool (st.connection would hand back one shared instance)."""
+    return st.connections.SQLConnection("gsheets")
+
+@st.cache_resource
+def get_storage_backend():
+    options = {
+        "pool_size": st.secrets.get("storage_pool_size", 4),
+        "timeout": st.secrets.get("storage_timeout_seconds", 20),
+    }
+    if st.secrets.get("storage_backend", "gsheets") == "sqlite":
+        return SQLiteBackend(st.secrets.get("storage_sqlite_path", "outlet_records.sqlite3"), **options)
+    return GoogleSheetsBackend(connect_sheets, ping_spreadsheet=st.secrets.gsheets.inventory_sheet_url, **options)
+
+backend = get_storage_backend()
+
+
+def per_outlet_tabs():
+    """With `per_outlet_tabs` set, each outlet's rows are appended to a worksheet named after it."""
+    return bool(st.secrets.get("per_outlet_tabs", False))
+
+@st.cache_resource
+def get_write_queue():
+    # The Sheets API allows 60 write requests a minute per user; a local backend needs no pacing.
+    return WriteQueue(
+        backend.append_rows,
+        rate_per_minute=st.secrets.get("sheet_writes_per_minute", 60 if backend.name == "gsheets" else None),
+        burst=st.secrets.get("sheet_write_burst", 10),
+        per_outlet_tabs=per_outlet_tabs(),
+        on_flush=lambda ms, rows: metrics.observe("sheet_append", ms),
+    )
+
+write_queue = get_write_queue()
+
+def drop_replayed_rows(df):
+    """Drops rows a retried batch appended twice (same Record ID); legacy rows have no ID."""
+    if "Record ID" not in df.columns:
+        return df
+    ids = df["Record ID"]
+    return df[ids.isna() | (ids == "") | ~ids.duplicated()]
+
+
+def read_sheet_since(spreadsheet, offset, worksheet=None):
+    """Reads only the data rows after `offset`."""
+    with metrics.span("sheet_fetch"):
+        return backend.read_since(spreadsheet, offset, worksheet)
+
+@st.cache_resource
+def get_sheet_cache():
+    # Rows saved before the switch to per-outlet tabs stay on the main tab (None).
+    partitions = [None, *outlets] if per_outlet_tabs() else None
+    return SheetCache(read_sheet_since, ttl=st.secrets.get("view_sync_ttl_seconds", 60),
+                      clean=drop_replayed_rows, partitions=partitions)
 
+sheet_cache = get_sheet_cache()
 
-@st.cache_resource(ttl="1h") 
-def get_sheets_connection():
-    return st.connection("gsheets", type=st.connections.SQLConnection)
+@st.cache_resource
+def get_records_engine():
+    return RecordsEngine()
 
-try:
-    conn = get_sheets_connection()
-except Exception as e:
-    # If connection fails
-    st.error("⚠️ Failed to connect to Google Sheets. Ensure your .streamlit/secrets.toml file is configured correctly and the service account has Editor access to the sheets.")
-    st.stop()
+records_engine = get_records_engine()
+
+@st.cache_resource
+def get_expiry_index():
+    index = ExpiryIndex()
+    # Load the saved entries in the background, so a fresh worker's sidebar
+    # alert doesn't wait for someone to open a saved-data page.
+    url = st.secrets.gsheets.inventory_sheet_url
+    sheet_cache.get_many([url])[url].add_done_callback(
+        lambda done: index.sync(done.result()) if done.exception() is None else None
+    )
+    return index
+
+expiry_index = get_expiry_index()
+
+@st.cache_resource
+def get_feedback_index():
+    return FeedbackIndex()
+
+feedback_index = get_feedback_index()
+
+@st.cache_resource
+def get_rollups():
+    return RollupStore(st.secrets.get("rollup_path", ROLLUP_PATH))
+
+rollups = get_rollups()
+
+def update_rollups(records, feedback=False):
+    """Folds newly queued records into the summary totals; a failure only costs a rebuild."""
+    try:
+        if feedback:
+            rollups.add_feedback(records)
+        else:
+            rollups.add_items(records)
+    except Exception as e:
+        st.toast(f"⚠️ Summary totals not updated ({e}). Rebuild them from the Summary page.", icon="⚠️")
+
+def render_sync_caption(spreadsheet):
+    info = sheet_cache.info(spreadsheet)
+    if info["age_s"] is not None:
+        st.caption(f"🔄 {info['rows']} rows · synced {info['age_s']:.0f}s ago · +{info['last_delta']} new on last sync")
+
+def render_queue_status():
+    stats = write_queue.stats()
+    flush = f"{stats['last_flush_ms']:.0f} ms" if stats["last_flush_ms"] is not None else "—"
+    st.sidebar.caption(f"📤 Sheet sync queue: **{stats['depth']}** pending · last flush {flush}")
+    if stats["depth"] and stats["paused_s"]:
+        st.sidebar.caption(f"🚦 Pacing appends to the Sheets quota across {stats['outlets_waiting']} outlet(s); "
+                           f"next send in {stats['paused_s']:.0f}s.")
+    elif stats["depth"] and stats["last_error"]:
+        st.sidebar.caption(f"⏳ Retrying (oldest {stats['oldest_age_s']}s): {stats['last_error']}")
+    if backend.healthy is False:
+        st.sidebar.caption(f"⚠️ Storage ({backend.name}) unreachable; entries are kept in the local journal. {backend.last_error}")
+
+def render_catalog_status():
+    """Sidebar line with the attached catalog version and the last reload's delta."""
+    if catalog_handle is None:
+        return
+    info = catalog_handle.info
+    line = f"📦 Catalog `{catalog.version}` · {len(catalog.frame):,} rows"
+    if info.get("published_at"):
+        line += f" · updated {datetime.fromtimestamp(info['published_at']).strftime('%d-%b %H:%M')}"
+    diff = info.get("diff")
+    if diff:
+        line += (f" · +{diff['added']:,} / −{diff['removed']:,} / ~{diff['changed']:,} barcodes"
+                 f" ({diff['rows']:+,} rows)")
+    st.sidebar.caption(line)
+    if catalog_handle.last_error:
+        st.sidebar.caption(f"⚠️ Catalog reload failed, still serving the previous version: {catalog_handle.last_error}")
+
+def render_expiry_alert(days=7):
+    """Sidebar warning from the expiry index: synced saved entries plus the ones queued here (never fetches the sheet itself)."""
+    totals, _ = expiry_index.expiring(days, [st.session_state.selected_outlet], with_detail=False)
+    if not totals.empty:
+        row = totals.iloc[0]
+        st.sidebar.warning(f"⏰ {row['items']} items ({row['qty']:.0f} pcs, {row['amount']:,.2f}) expire within {days} days. See **Expiring Soon**.")
+
+def render_performance_panel():
+    """Admin-only sidebar view of the timing histograms, with export."""
+    with st.sidebar.expander("⏱ Performance"):
+        st.caption("Storage: " + " · ".join(f"{k} {v}" for k, v in backend.status().items() if v is not None))
+        queue_stats = {k: write_queue.stats()[k] for k in ("sent", "failed_batches", "throttled", "tokens")}
+        st.caption("Write queue: " + " · ".join(f"{k} {v}" for k, v in queue_stats.items() if v is not None))
+        summary = pd.DataFrame(metrics.summary())
+        if summary.empty:
+            st.caption("No timings recorded yet.")
+            return
+        spans = st.multiselect("Spans", sorted(summary["span"].unique()), key="perf_spans")
+        if spans:
+            summary = summary[summary["span"].isin(spans)]
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        st.download_button("⬇️ Prometheus text", metrics.to_prometheus(), file_name="metrics.prom",
+                           mime="text/plain", key="download_metrics_prom")
+        st.download_button("⬇️ JSON", metrics.to_json(), file_name="metrics.json",
+                           mime="application/json", key="download_metrics_json")
 
 CUSTOM_RATING_CSS = """
 <style>
@@ -76,70 +250,47 @@ div[data-testid="stForm"] > div > div:nth-child(4) div[role="radiogroup"] label
 }
 </style>
 """
-def inject_numeric_keyboard_script(target_label):
-    """
-    Injects JavaScript to find the text input widget by its label and set
-    its HTML 'inputmode' attribute to 'numeric', triggering the number keyboard on mobile.
-    """
-    script = f"""
-    <script>
-        function setInputMode() {{
-            const elements = document.querySelectorAll('label');
-            elements.forEach(label => {{
-                if (label.textContent.includes('{target_label}')) {{
-                    const input = label.nextElementSibling.querySelector('input');
-                    if (input) {{
-                        input.setAttribute('inputmode', 'numeric');
-                        input.setAttribute('pattern', '[0-9]*');
-                    }}
-                }}
-            }});
-        }}
-        // Run on load and whenever Streamlit rerenders the component (e.g., after a form submit)
-        window.onload = setInputMode;
-        // Also observe for changes in the DOM (needed for dynamic Streamlit content)
-        new MutationObserver(setInputMode).observe(document.body, {{ childList: true, subtree: true }});
-    </script>
-    """
-    st.markdown(script, unsafe_allow_html=True)
-@st.cache_data
+@st.cache_resource
 def load_item_data():
+    """This process's handle on the shared (memory-mapped) catalog, attached once."""
     file_path = "alllist.xlsx" 
+    handle = SharedCatalog(file_path, on_attach=lambda ms, version: metrics.observe("catalog_attach", ms))
     try:
-        df = pd.read_excel(file_path)
-        df.columns = df.columns.str.strip()
-        
-        required_cols = ["Item Bar Code", "Item Name", "LP Supplier"] 
-        for col in required_cols:
-            if col not in df.columns:
-                st.error(f"⚠️ Missing critical column: '{col}' in alllist.xlsx. Please check the file.")
-                return pd.DataFrame()
-        return df
+        with metrics.span("catalog_load"):
+            handle.get()
+    except KeyError as e:
+        st.error(f"⚠️ Missing critical column: '{e.args[0]}' in alllist.xlsx. Please check the file.")
+        return None
     except FileNotFoundError:
         st.error(f"⚠️ Data file not found: {file_path}. Please ensure the file is in the application directory.")
-        return pd.DataFrame()
+        return None
+    handle.watch(st.secrets.get("catalog_watch_seconds", 10))
+    return handle
 
-item_data = load_item_data()
+catalog_handle = load_item_data()
+
+def current_catalog():
+    """The newest attached snapshot (a background reload may swap it between fragment reruns)."""
+    return catalog_handle.get() if catalog_handle is not None else Catalog(pd.DataFrame())
+
+catalog = current_catalog()
 
-outlets = [
-    "Hilal", "Safa Super", "Azhar HP", "Azhar", "Blue Pearl", "Fida", "Hadeqat",
-    "Jais", "Sabah", "Sahat", "Shams salem", "Shams Liwan", "Superstore",
-    "Tay Tay", "Safa oudmehta", "Port saeed"
-]
 password = "123123"
 
 for key in ["logged_in", "selected_outlet", "submitted_items",
              "barcode_value", "item_name_input", "supplier_input", 
              "temp_item_name_manual", "temp_supplier_manual",
              "lookup_data", "submitted_feedback", "barcode_found",
-             "staff_name"]: 
+             "staff_name", "bulk_batch", "catalog_search_query", "is_admin", "last_scan_seq"]: 
     
     if key not in st.session_state:
-        if key in ["submitted_items", "submitted_feedback"]:
-            st.session_state[key] = []
-        elif key == "lookup_data":
+        if key == "submitted_items":
+            st.session_state[key] = RecordBuffer(ITEM_BUFFER_SCHEMA)
+        elif key == "submitted_feedback":
+            st.session_state[key] = RecordBuffer(FEEDBACK_BUFFER_SCHEMA)
+        elif key in ["lookup_data", "bulk_batch"]:
             st.session_state[key] = pd.DataFrame()
-        elif key == "barcode_found":
+        elif key in ["barcode_found", "is_admin"]:
             st.session_state[key] = False 
         else:
             st.session_state[key] = ""
@@ -152,9 +303,15 @@ def update_supplier_state():
     """Updates the main supplier_input state variable from the temp manual input."""
     st.session_state.supplier_input = st.session_state.temp_supplier_manual
 
-def lookup_item_and_update_state():
+def use_catalog_suggestion(item_name, supplier):
+    """Fills the manual entry fields from a picked catalog suggestion."""
+    st.session_state.item_name_input = item_name
+    st.session_state.supplier_input = supplier
+    st.session_state.temp_item_name_manual = item_name
+    st.session_state.temp_supplier_manual = supplier
+
+def lookup_item_and_update_state(barcode):
     """Performs the barcode lookup and updates relevant session state variables."""
-    barcode = st.session_state.lookup_barcode_input
     
     st.session_state.lookup_data = pd.DataFrame()
     st.session_state.barcode_value = barcode 
@@ -164,19 +321,22 @@ def lookup_item_and_update_state():
     
     st.session_state.temp_item_name_manual = ""
     st.session_state.temp_supplier_manual = "" 
+    st.session_state.catalog_search_query = ""
     
     if not barcode:
         st.toast("⚠️ Barcode cleared.", icon="❌")
         return
 
-    if not item_data.empty:
-        match = item_data[item_data["Item Bar Code"].astype(str).str.strip() == str(barcode).strip()]
+    catalog = current_catalog()
+    if not catalog.empty:
+        with metrics.span("barcode_lookup", st.session_state.selected_outlet, "Outlet Dashboard"):
+            match = catalog.lookup(barcode)
         
         if not match.empty:
             st.session_state.barcode_found = True
             row = match.iloc[0]
             
-            df_display = row[["Item Name", "LP Supplier"]].to_frame().T
+            df_display = match[["Item Name", "LP Supplier"]]
             df_display.columns = ["Item Name", "Supplier"]
             st.session_state.lookup_data = df_display.reset_index(drop=True)
             
@@ -227,29 +387,287 @@ def process_item_entry(barcode, item_name, qty, cost, selling, expiry, supplier,
         "Supplier": supplier.strip(),
         "Remarks": remarks.strip(),
         "Outlet": outlet_name,
-        "Staff Name": staff_name.strip()
+        "Staff Name": staff_name.strip(),
+        "Record ID": new_record_id()
     }
     
     try:
-        conn.append(
-            spreadsheet=st.secrets.gsheets.inventory_sheet_url, 
-            data=[list(new_record.values())],
-            headers=list(new_record.keys())
-        )
+        with metrics.span("item_enqueue", outlet_name, "Outlet Dashboard"):
+            write_queue.enqueue(st.secrets.gsheets.inventory_sheet_url, new_record, new_record["Record ID"], outlet_name)
     except Exception as e:
-        st.error(f"🚨 Failed to save item data to Google Sheet. Check connection, URL, and permissions. Error: {e}")
+        st.error(f"🚨 Failed to save item data to the local sync journal. Error: {e}")
         return False
         
     st.session_state.submitted_items.append(new_record)
+    update_rollups([new_record])
+    expiry_index.add_records([new_record])
 
     st.session_state.barcode_value = ""          
     st.session_state.lookup_data = pd.DataFrame()
     st.session_state.barcode_found = False
     
-    st.toast("✅ Item added and saved permanently to Google Sheet!", icon="💾")
+    st.toast("✅ Item added and queued for Google Sheet!", icon="💾")
     return True
 
 
+def render_bulk_entry(form_type, outlet_name):
+    """Paste/upload many rows, resolve them against the catalog at once, save as one batch."""
+    st.markdown("### 📥 Bulk Entry")
+    st.caption("One item per line: barcode, qty, expiry, cost, selling, remarks (tab, comma or space separated, or just a barcode per line; a header row is optional). Blank cells must be filled in below before saving.")
+
+    col_paste, col_upload = st.columns(2)
+    with col_paste:
+        pasted = st.text_area("Paste rows", key="bulk_paste", height=150)
+    with col_upload:
+        uploaded = st.file_uploader("...or upload a CSV / Excel file", type=["csv", "xlsx"], key="bulk_upload")
+
+    if st.button("🔍 Resolve Barcodes", type="secondary"):
+        try:
+            rows = parse_bulk_rows(uploaded if uploaded is not None else pasted)
+        except Exception as e:
+            st.error(f"⚠️ Could not read the bulk rows. Error: {e}")
+            rows = None
+        if rows is not None:
+            if rows.empty:
+                st.toast("⚠️ No barcode rows found.", icon="❌")
+            st.session_state.bulk_batch = resolve_bulk_rows(rows, current_catalog())
+
+    batch = st.session_state.bulk_batch
+    if batch.empty:
+        return
+
+    missing = int((~batch["Found"]).sum())
+    st.markdown(f"**{len(batch)}** rows · **{len(batch) - missing}** found in catalog · **{missing}** need manual Item Name/Supplier")
+    edited = st.data_editor(
+        batch,
+        key="bulk_editor",
+        hide_index=True,
+        use_container_width=True,
+        disabled=["Found", "Amount", "GP%"],
+        column_config={
+            "Qty": st.column_config.NumberColumn(min_value=1, step=1),
+            "Expiry": st.column_config.DateColumn(format="DD-MMM-YY", disabled=form_type == "Damages"),
+            "Cost": st.column_config.NumberColumn(min_value=0.0, step=0.01),
+            "Selling": st.column_config.NumberColumn(min_value=0.0, step=0.01),
+        },
+    )
+    edited = with_bulk_totals(edited)
+    st.info(f"💰 **Batch Amount**: {edited['Amount'].sum():.2f}")
+
+    col_save, col_clear = st.columns([1, 1])
+    with col_save:
+        if st.button(f"💾 Save {len(edited)} Items", type="primary"):
+            staff_name = st.session_state.staff_name
+            if not staff_name.strip():
+                st.toast("❌ Please enter your Staff Name before saving.", icon="❌")
+                return
+            blank = edited["Item Name"].astype(str).str.strip() == ""
+            if blank.any():
+                st.toast(f"❌ {int(blank.sum())} rows still need an Item Name.", icon="❌")
+                return
+            unpriced = edited[["Qty", "Cost", "Selling"]].isna().any(axis=1)
+            if unpriced.any():
+                st.toast(f"❌ {int(unpriced.sum())} rows have a blank Qty, Cost or Selling Price.", icon="❌")
+                return
+            if form_type != "Damages":
+                undated = pd.to_datetime(edited["Expiry"], errors="coerce").isna()
+                if undated.any():
+                    st.toast(f"❌ {int(undated.sum())} rows still need an Expiry date.", icon="❌")
+                    return
+            records = build_bulk_records(edited, form_type, outlet_name, staff_name)
+            try:
+                write_queue.enqueue_many(
+                    st.secrets.gsheets.inventory_sheet_url, records, [r["Record ID"] for r in records], outlet_name
+                )
+            except Exception as e:
+                st.error(f"🚨 Failed to save the batch to the local sync journal. Error: {e}")
+                return
+            st.session_state.submitted_items.extend(records)
+            update_rollups(records)
+            expiry_index.add_records(records)
+            st.session_state.bulk_batch = pd.DataFrame()
+            st.toast(f"✅ {len(records)} items queued for Google Sheet!", icon="💾")
+            st.rerun()
+    with col_clear:
+        if st.button("🗑 Discard Batch", type="secondary"):
+            st.session_state.bulk_batch = pd.DataFrame()
+            st.rerun()
+
+
+@st.fragment
+def render_barcode_lookup():
+    """Lookup form and its result; a scan reruns only this fragment."""
+    scan = barcode_input(
+        "Barcode Lookup",
+        key="lookup_barcode_input",
+        value=st.session_state.barcode_value,
+        placeholder="Enter or scan barcode and press Enter to search details",
+        auto_submit=st.secrets.get("barcode_auto_submit", True),
+    )
+    if scan is not None and scan["seq"] != st.session_state.last_scan_seq:
+        st.session_state.last_scan_seq = scan["seq"]
+        lookup_item_and_update_state(scan["barcode"])
+
+    if not st.session_state.lookup_data.empty:
+        st.markdown("### 🔍 Found Item Details")
+        st.dataframe(st.session_state.lookup_data, use_container_width=True, hide_index=True)
+
+    if st.session_state.barcode_value.strip() and not st.session_state.barcode_found:
+        render_manual_entry()
+
+    if st.session_state.barcode_value.strip():
+        st.markdown("---") 
+
+@st.fragment
+def render_manual_entry():
+    """Catalog search and manual name/supplier fields for a barcode miss."""
+    st.markdown("### ⚠️ Manual Item Entry (Barcode Not Found)")
+    st.text_input(
+        "🔎 Find in catalog",
+        key="catalog_search_query",
+        placeholder="Type part of the item or supplier name and press Enter"
+    )
+    if st.session_state.catalog_search_query.strip():
+        suggestions = current_catalog().name_index.search(st.session_state.catalog_search_query)
+        if suggestions.empty:
+            st.caption("No close catalog matches. Enter the details manually below.")
+        else:
+            labels = [f"{n} — {s}" for n, s in zip(suggestions["Item Name"], suggestions["LP Supplier"])]
+            col_pick, col_use = st.columns([5, 1])
+            with col_pick:
+                pick = st.selectbox("Suggestions", range(len(labels)), format_func=labels.__getitem__)
+            with col_use:
+                st.markdown("<div style='height: 28px;'></div>", unsafe_allow_html=True)
+                st.button(
+                    "✅ Use",
+                    on_click=use_catalog_suggestion,
+                    args=(str(suggestions["Item Name"].iloc[pick]), str(suggestions["LP Supplier"].iloc[pick])),
+                    use_container_width=True
+                )
+    col_manual_name, col_manual_supplier = st.columns(2)
+    with col_manual_name:
+        st.text_input(
+            "Item Name (Manual)", 
+            value=st.session_state.item_name_input, 
+            key="temp_item_name_manual", 
+            on_change=update_item_name_state
+        )
+    with col_manual_supplier:
+        st.text_input(
+            "Supplier Name (Manual)", 
+            value=st.session_state.supplier_input, 
+            key="temp_supplier_manual", 
+            on_change=update_supplier_state
+        )
+
+@st.fragment
+def render_item_entry_form(form_type, outlet_name):
+    """Qty/expiry/price form. Only a successful add reruns the whole page (for the session list)."""
+    with st.form("item_entry_form", clear_on_submit=True): 
+    
+        col1, col2 = st.columns(2)
+        with col1:
+            qty = st.number_input("Qty [PCS]", min_value=1, value=1, step=1)
+        with col2:
+            if form_type != "Damages":
+                expiry = st.date_input("Expiry Date", datetime.now().date())
+            else:
+                expiry = None
+
+        col5, col6 = st.columns(2)
+        with col5:
+            cost = st.number_input("Cost", min_value=0.0, value=0.0, step=0.01)
+        with col6:
+            selling = st.number_input("Selling Price", min_value=0.0, value=0.0, step=0.01)
+
+        temp_cost = float(cost)
+        temp_selling = float(selling)
+        
+        gp = ((temp_selling - temp_cost) / temp_cost * 100) if temp_cost else 0
+        st.info(f"💹 **GP% (Profit Margin)**: {gp:.2f}%")
+
+        remarks = st.text_area("Remarks [if any]", value="")
+
+        submitted_item = st.form_submit_button(
+            "➕ Add to List", 
+            type="primary",
+        )
+    if submitted_item:
+    
+        final_item_name = st.session_state.item_name_input
+        final_supplier = st.session_state.supplier_input
+        final_staff_name = st.session_state.staff_name 
+
+        if not st.session_state.barcode_value.strip():
+            st.toast("❌ Please enter a Barcode before adding to the list.", icon="❌")
+            return
+    
+        if not final_staff_name.strip():
+            st.toast("❌ Please enter your Staff Name before adding to the list.", icon="❌")
+            return
+
+        success = process_item_entry(
+            st.session_state.barcode_value, 
+            final_item_name,                 
+            qty,           
+            cost,      
+            selling,   
+            expiry,      
+            final_supplier,                  
+            remarks,     
+            form_type,   
+            outlet_name,
+            final_staff_name 
+        )
+    
+        if success:
+            st.rerun()
+
+def delete_session_item(row_id):
+    """Removes one entry from the session list (before the fragment redraws it)."""
+    st.session_state.submitted_items.delete(row_id)
+    st.toast("✅ Item removed from session list", icon="🗑")
+
+@st.fragment
+def render_session_list():
+    """The session list; deleting a row reruns only this fragment."""
+    if not st.session_state.submitted_items:
+        return
+    st.markdown("### 🧾 Items Added (Session List)")
+    df = st.session_state.submitted_items.frame()
+    st.dataframe(df.drop(columns="Record ID"), use_container_width=True, hide_index=True)
+
+    col_submit, col_delete = st.columns([1, 1])
+    with col_submit:
+        if st.button("✅ Submit All & Clear List", type="primary", help="Data is already saved to Google Sheets. This button clears the temporary list."):
+            st.success(f"✅ Temporary list of {len(st.session_state.submitted_items)} items cleared. All records are saved permanently.")
+            
+            st.session_state.submitted_items.clear()
+            st.session_state.barcode_value = ""
+            st.session_state.item_name_input = ""
+            st.session_state.supplier_input = ""
+            st.session_state.barcode_found = False
+            st.session_state.temp_item_name_manual = "" 
+            st.session_state.temp_supplier_manual = "" 
+            st.session_state.lookup_data = pd.DataFrame() 
+            st.session_state.staff_name = "" 
+            st.rerun() 
+
+    with col_delete:
+        labels = {None: "Select item to remove..."}
+        for i, (row_id, name, qty) in enumerate(zip(df.index.tolist(), df["Item Name"], df["Qty"])):
+            labels[row_id] = f"{i + 1}. {name} ({qty} pcs)"
+
+        to_delete = st.selectbox("Select Item to Delete from Session List", list(labels), format_func=labels.get)
+        if to_delete is not None:
+            st.button(
+                "❌ Delete Selected from Session",
+                type="secondary",
+                on_click=delete_session_item,
+                args=(to_delete,)
+            )
+
+
 if not st.session_state.logged_in:
     st.title("🔐 Outlet Login")
     username = st.text_input("Username", placeholder="Enter username")
@@ -261,22 +679,31 @@ if not st.session_state.logged_in:
             st.session_state.logged_in = True
             st.session_state.selected_outlet = outlet
             st.rerun()
+        elif username == "admin" and st.secrets.get("admin_password") and pwd == st.secrets.get("admin_password"):
+            st.session_state.logged_in = True
+            st.session_state.is_admin = True
+            st.session_state.selected_outlet = outlet
+            st.rerun()
         else:
             st.error("❌ Invalid username or password")
 
 else:
     st.markdown(CUSTOM_RATING_CSS, unsafe_allow_html=True) 
     
-    page = st.sidebar.radio("📌 Select Page", ["Outlet Dashboard", "Customer Feedback", "View Saved Data"])
+    page = st.sidebar.radio("📌 Select Page", ["Outlet Dashboard", "Customer Feedback", "View Saved Data", "Summary", "Expiring Soon"])
+    render_queue_status()
+    render_catalog_status()
+    render_expiry_alert()
+    if st.session_state.is_admin:
+        render_performance_panel()
 
     if page == "Outlet Dashboard":
         outlet_name = st.session_state.selected_outlet
         st.markdown(f"<h2 style='text-align:center;'>🏪 {outlet_name} Dashboard</h2>", unsafe_allow_html=True)
         form_type = st.sidebar.radio("📋 Select Form Type", ["Expiry", "Damages", "Near Expiry"])
+        entry_mode = st.sidebar.radio("🧮 Entry Mode", ["Single Item", "Bulk"], help="Bulk: paste or upload many barcode rows at once.")
         st.markdown("---")
         
-        inject_numeric_keyboard_script("Barcode Lookup")
-
 
         st.session_state.staff_name = st.text_input(
             "👤 Staff Name (Required)",
@@ -286,145 +713,13 @@ else:
         )
         st.markdown("---")
 
-        with st.form("barcode_lookup_form", clear_on_submit=False):
-            
-            col_bar, col_btn = st.columns([5, 1])
-            
-            with col_bar:
-                st.text_input(
-                    "Barcode Lookup",
-                    key="lookup_barcode_input", 
-                    placeholder="Enter or scan barcode and press Enter to search details",
-                    value=st.session_state.barcode_value
-                )
-            
-            with col_btn:
-                st.markdown("<div style='height: 33px;'></div>", unsafe_allow_html=True)
-                st.form_submit_button(
-                    "🔍 Search", 
-                    on_click=lookup_item_and_update_state, 
-                    help="Click or press Enter in the barcode field to look up item.",
-                    type="secondary",
-                    use_container_width=True
-                )
-
-        if not st.session_state.lookup_data.empty:
-            st.markdown("### 🔍 Found Item Details")
-            st.dataframe(st.session_state.lookup_data, use_container_width=True, hide_index=True)
-        
-        if st.session_state.barcode_value.strip() and not st.session_state.barcode_found:
-             st.markdown("### ⚠️ Manual Item Entry (Barcode Not Found)")
-             col_manual_name, col_manual_supplier = st.columns(2)
-             with col_manual_name:
-                 st.text_input(
-                     "Item Name (Manual)", 
-                     value=st.session_state.item_name_input, 
-                     key="temp_item_name_manual", 
-                     on_change=update_item_name_state
-                 )
-             with col_manual_supplier:
-                 st.text_input(
-                     "Supplier Name (Manual)", 
-                     value=st.session_state.supplier_input, 
-                     key="temp_supplier_manual", 
-                     on_change=update_supplier_state
-                 )
-
-        if st.session_state.barcode_value.strip():
-             st.markdown("---") 
-
-        with st.form("item_entry_form", clear_on_submit=True): 
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                qty = st.number_input("Qty [PCS]", min_value=1, value=1, step=1)
-            with col2:
-                if form_type != "Damages":
-                    expiry = st.date_input("Expiry Date", datetime.now().date())
-                else:
-                    expiry = None
-
-            col5, col6 = st.columns(2)
-            with col5:
-                cost = st.number_input("Cost", min_value=0.0, value=0.0, step=0.01)
-            with col6:
-                selling = st.number_input("Selling Price", min_value=0.0, value=0.0, step=0.01)
-
-            temp_cost = float(cost)
-            temp_selling = float(selling)
-                
-            gp = ((temp_selling - temp_cost) / temp_cost * 100) if temp_cost else 0
-            st.info(f"💹 **GP% (Profit Margin)**: {gp:.2f}%")
-
-            remarks = st.text_area("Remarks [if any]", value="")
-
-            submitted_item = st.form_submit_button(
-                "➕ Add to List", 
-                type="primary",
-            )
-        if submitted_item:
-            
-            final_item_name = st.session_state.item_name_input
-            final_supplier = st.session_state.supplier_input
-            final_staff_name = st.session_state.staff_name 
-
-            if not st.session_state.barcode_value.strip():
-                 st.toast("❌ Please enter a Barcode before adding to the list.", icon="❌")
-                 st.rerun() 
-            
-            if not final_staff_name.strip():
-                st.toast("❌ Please enter your Staff Name before adding to the list.", icon="❌")
-                st.rerun()
+        if entry_mode == "Bulk":
+            render_bulk_entry(form_type, outlet_name)
+        else:
+            render_barcode_lookup()
+            render_item_entry_form(form_type, outlet_name)
 
-            success = process_item_entry(
-                st.session_state.barcode_value, 
-                final_item_name,                 
-                qty,           
-                cost,      
-                selling,   
-                expiry,      
-                final_supplier,                  
-                remarks,     
-                form_type,   
-                outlet_name,
-                final_staff_name 
-            )
-            
-            if success:
-                 st.rerun()
-
-
-        if st.session_state.submitted_items:
-            st.markdown("### 🧾 Items Added (Session List)")
-            df = pd.DataFrame(st.session_state.submitted_items)
-            st.dataframe(df, use_container_width=True, hide_index=True)
-
-            col_submit, col_delete = st.columns([1, 1])
-            with col_submit:
-                if st.button("✅ Submit All & Clear List", type="primary", help="Data is already saved to Google Sheets. This button clears the temporary list."):
-                    st.success(f"✅ Temporary list of {len(st.session_state.submitted_items)} items cleared. All records are saved permanently.")
-                    
-                    st.session_state.submitted_items = []
-                    st.session_state.barcode_value = ""
-                    st.session_state.item_name_input = ""
-                    st.session_state.supplier_input = ""
-                    st.session_state.barcode_found = False
-                    st.session_state.temp_item_name_manual = "" 
-                    st.session_state.temp_supplier_manual = "" 
-                    st.session_state.lookup_data = pd.DataFrame() 
-                    st.session_state.staff_name = "" 
-                    st.rerun() 
-
-            with col_delete:
-                options = [f"{i+1}. {item['Item Name']} ({item['Qty']} pcs)" for i, item in enumerate(st.session_state.submitted_items)]
-                if options:
-                    to_delete = st.selectbox("Select Item to Delete from Session List", ["Select item to remove..."] + options)
-                    if to_delete != "Select item to remove...":
-                        if st.button("❌ Delete Selected from Session", type="secondary"):
-                            index = options.index(to_delete) 
-                            st.session_state.submitted_items.pop(index)
-                            st.success("✅ Item removed from session list")
-                            st.rerun()
+        render_session_list()
 
     
     elif page == "Customer Feedback":
@@ -458,90 +753,280 @@ else:
                     "Rating": f"{rating} / 5",
                     "Outlet": outlet_name,
                     "Feedback": feedback,
+                    "Record ID": new_record_id(),
                 }
                 
                 try:
-                    conn.append(
-                        spreadsheet=st.secrets.gsheets.feedback_sheet_url, 
-                        data=[list(new_feedback.values())],
-                        headers=list(new_feedback.keys())
-                    )
+                    write_queue.enqueue(st.secrets.gsheets.feedback_sheet_url, new_feedback, new_feedback["Record ID"],
+                                        outlet_name)
                 except Exception as e:
-                    st.error(f"🚨 Failed to save feedback to Google Sheet. Error: {e}")
-                
-                st.session_state.submitted_feedback.append(new_feedback)
-                
-                st.success("✅ Feedback submitted and saved permanently to Google Sheet!")
+                    st.error(f"🚨 Failed to save feedback to the local sync journal. Error: {e}")
+                else:
+                    st.session_state.submitted_feedback.append(new_feedback)
+                    update_rollups([new_feedback], feedback=True)
+                    feedback_index.add_records([new_feedback])
+                    st.success("✅ Feedback submitted and queued for Google Sheet!")
             else:
                 st.error("⚠️ Please fill **Customer Name** and **Feedback** before submitting.")
 
         if st.session_state.submitted_feedback:
             st.markdown("### 🗂 Recent Customer Feedback (Session Records)")
-            df = pd.DataFrame(st.session_state.submitted_feedback)
-            st.dataframe(df.iloc[::-1], use_container_width=True, hide_index=True)
+            df = st.session_state.submitted_feedback.frame()
+            st.dataframe(df.iloc[::-1].drop(columns="Record ID"), use_container_width=True, hide_index=True)
 
             if st.button("🗑 Clear All Session Feedback Records", type="secondary", help="This only clears the display, the data is saved in Google Sheets."):
-                st.session_state.submitted_feedback = []
+                st.session_state.submitted_feedback.clear()
                 st.rerun()
                 
     elif page == "View Saved Data":
         st.title("📊 All Permanently Saved Data Records")
         st.markdown("---")
 
-        @st.cache_data
-        def convert_df_to_csv(df):
-            return df.to_csv(index=False).encode('utf-8')
-
-        st.markdown("### 📦 Inventory Submissions (Expiry/Damages/Near Expiry)")
-        
-        try:
-            inventory_df = conn.read(spreadsheet=st.secrets.gsheets.inventory_sheet_url)
-        except Exception as e:
-            st.error(f"🚨 Error loading Inventory Data from Sheet. Please check the sheet URL/permissions. Error: {e}")
-            inventory_df = pd.DataFrame()
+        def render_export_button(table, label, filters):
+            """Deferred download: the file is only written (or reused) when clicked."""
+            fmt = st.session_state.get("export_format", "CSV")
+            ext, mime, _ = EXPORT_FORMATS[fmt]
 
+            def read_export():
+                return open(records_engine.export(table, fmt, **filters), "rb")
 
-        if not inventory_df.empty:
-            st.dataframe(inventory_df.iloc[::-1], 
-                         use_container_width=True, 
-                         hide_index=True)
-            
-            csv_data = convert_df_to_csv(inventory_df)
             st.download_button(
-                label="⬇️ Download Inventory Data as CSV",
-                data=csv_data,
-                file_name="inventory_data.csv",
-                mime='text/csv',
-                key='download_inventory_csv'
+                label=f"⬇️ Download {label} as {fmt}",
+                data=read_export,
+                file_name=f"{table}_data.{ext}",
+                mime=mime,
+                key=f"download_{table}_export",
             )
-            
+
+        force_sync = st.button("🔄 Refresh from Google Sheets", help=f"Saved data is re-synced automatically every {sheet_cache.ttl}s; this fetches new rows now.")
+
+        # Both sheets are fetched at once; each section renders as soon as its own data lands.
+        sheets = {
+            "inventory": st.secrets.gsheets.inventory_sheet_url,
+            "feedback": st.secrets.gsheets.feedback_sheet_url,
+        }
+        fetch_started = time.perf_counter()
+        pending = {future: table for table, future in
+                   zip(sheets, sheet_cache.get_many(sheets.values(), force=force_sync).values())}
+
+        with st.expander("🔎 Filters", expanded=True):
+            col_outlet, col_dates = st.columns(2)
+            with col_outlet:
+                filter_outlets = st.multiselect("Outlet", outlets, placeholder="All outlets")
+            with col_dates:
+                filter_dates = st.date_input("Date range", value=(), help="Leave empty for all dates.")
+            col_forms, col_format = st.columns(2)
+            with col_forms:
+                filter_forms = st.multiselect("Form Type", ["Expiry", "Damages", "Near Expiry"], placeholder="All form types")
+            with col_format:
+                st.selectbox("Download format", list(EXPORT_FORMATS), key="export_format")
+
+        date_filters = {
+            "start": filter_dates[0] if len(filter_dates) > 0 else None,
+            "end": filter_dates[-1] if len(filter_dates) > 0 else None,
+        }
+        inventory_filters = {"outlets": filter_outlets, "form_types": filter_forms, **date_filters}
+        feedback_filters = {"outlets": filter_outlets, **date_filters}
+
+        def render_inventory(inventory_df):
+            if not inventory_df.empty:
+                col_group, col_top = st.columns(2)
+                with col_group:
+                    group_by = st.selectbox("Loss summary by", list(LOSS_GROUPS), key="loss_group_by")
+                    st.dataframe(records_engine.loss_summary(group_by, **inventory_filters),
+                                 use_container_width=True, hide_index=True)
+                with col_top:
+                    top_n = st.number_input("Top items by loss Amount", min_value=1, max_value=100, value=10, step=1, key="top_items_n")
+                    st.dataframe(records_engine.top_items(top_n, **inventory_filters),
+                                 use_container_width=True, hide_index=True)
+
+                matched = records_engine.count("inventory", **inventory_filters)
+                st.caption(f"{matched} matching records (newest {min(matched, 500)} shown)")
+                st.dataframe(records_engine.records("inventory", limit=500, **inventory_filters), 
+                             use_container_width=True, 
+                             hide_index=True)
+                
+                render_export_button("inventory", "Inventory Data", inventory_filters)
+                
+            else:
+                st.info("No inventory data found in Google Sheets.")
+
+        def render_feedback(feedback_df):
+            if not feedback_df.empty:
+                st.dataframe(records_engine.rating_summary(**feedback_filters),
+                             use_container_width=True, hide_index=True)
+
+                col_query, col_rating = st.columns([3, 1])
+                with col_query:
+                    query = st.text_input("🔎 Search feedback text", key="feedback_search",
+                                          placeholder='e.g. parking, "expired bread", deliver*')
+                with col_rating:
+                    rating_range = st.slider("Rating", min_value=1, max_value=5, value=(1, 5), key="feedback_rating")
+                if query.strip():
+                    with metrics.span("feedback_search", st.session_state.selected_outlet, page):
+                        hits, total = feedback_index.search(
+                            query, filter_outlets,
+                            min_rating=rating_range[0] if rating_range[0] > 1 else None,
+                            max_rating=rating_range[1] if rating_range[1] < 5 else None,
+                            **date_filters,
+                        )
+                    st.caption(f"{total} matching responses (best {len(hits)} shown, most relevant first)")
+                    st.dataframe(hits.rename(columns=FEEDBACK_DETAIL_HEADERS),
+                                 use_container_width=True, hide_index=True)
+
+                matched = records_engine.count("feedback", **feedback_filters)
+                st.caption(f"{matched} matching records (newest {min(matched, 500)} shown)")
+                st.dataframe(records_engine.records("feedback", limit=500, **feedback_filters), 
+                             use_container_width=True, 
+                             hide_index=True)
+                
+                render_export_button("feedback", "Feedback Data", feedback_filters)
+                
+            else:
+                st.info("No customer feedback data found in Google Sheets.")
+
+        sections = {}
+        st.markdown("### 📦 Inventory Submissions (Expiry/Damages/Near Expiry)")
+        sections["inventory"] = (st.container(), render_inventory, "Inventory")
+        st.markdown("---")
+        st.markdown("### 💬 Customer Feedback Records")
+        sections["feedback"] = (st.container(), render_feedback, "Feedback")
+
+        loading = {}
+        for table, (box, _, label) in sections.items():
+            with box:
+                loading[table] = st.empty()
+                loading[table].caption(f"⏳ Loading {label} Data from Google Sheets...")
+
+        for future in as_completed(pending):
+            table = pending[future]
+            box, render, label = sections[table]
+            metrics.observe(f"{table}_read", (time.perf_counter() - fetch_started) * 1000,
+                            st.session_state.selected_outlet, page)
+            loading[table].empty()
+            with box:
+                try:
+                    df = future.result()
+                except Exception as e:
+                    st.error(f"🚨 Error loading {label} Data from Sheet. Please check the sheet URL/permissions. Error: {e}")
+                else:
+                    render_sync_caption(sheets[table])
+                    if table == "inventory":
+                        expiry_index.sync(df)
+                    else:
+                        feedback_index.sync(df)
+                    records_engine.sync(table, df)
+                    render(df)
+
+    elif page == "Summary":
+        st.title("📈 Loss & Rating Summary")
+        st.caption("Running totals kept up to date as entries are saved (daily buckets), so this page does not read the sheets.")
+        st.markdown("---")
+
+        col_start, col_end = st.columns(2)
+        with col_start:
+            summary_start = st.date_input("From", value=datetime.now().date() - timedelta(days=30), key="summary_start")
+        with col_end:
+            summary_end = st.date_input("To", value=datetime.now().date(), key="summary_end")
+
+        with metrics.span("summary_read", st.session_state.selected_outlet, page):
+            loss_by_outlet = rollups.loss(("outlet", "form_type"), summary_start, summary_end)
+            loss_by_supplier = rollups.loss(("supplier",), summary_start, summary_end)
+            daily_loss = rollups.daily_amount(summary_start, summary_end)
+            ratings = rollups.ratings(summary_start, summary_end)
+            totals = rollups.totals(summary_start, summary_end)
+
+        if loss_by_outlet.empty and ratings.empty:
+            st.info("No saved entries in this date range.")
         else:
-            st.info("No inventory data found in Google Sheets.")
+            col_amount, col_items, col_gp, col_rating = st.columns(4)
+            col_amount.metric("💰 Loss Amount", f"{totals['amount']:,.2f}")
+            col_items.metric("📦 Entries", f"{totals['items']:,}")
+            col_gp.metric("💹 Avg GP%", f"{totals['avg_gp']:.2f}%" if totals["avg_gp"] is not None else "—")
+            col_rating.metric("🌟 Avg Rating", f"{totals['avg_rating']:.2f} / 5 ({totals['responses']:,})" if totals["avg_rating"] is not None else "—")
+
+            st.markdown("### 🏪 Loss Amount by Outlet and Form Type")
+            st.dataframe(
+                loss_by_outlet.pivot_table(index="outlet", columns="form_type", values="amount", aggfunc="sum", fill_value=0, margins=True, margins_name="Total"),
+                use_container_width=True,
+            )
+            if not daily_loss.empty:
+                st.bar_chart(daily_loss, x="day", y="amount", color="form_type")
+
+            col_suppliers, col_ratings = st.columns(2)
+            with col_suppliers:
+                st.markdown("### 🚚 Top Suppliers by Loss")
+                st.dataframe(loss_by_supplier.head(15), use_container_width=True, hide_index=True)
+            with col_ratings:
+                st.markdown("### 💬 Customer Rating by Outlet")
+                st.dataframe(ratings, use_container_width=True, hide_index=True)
 
         st.markdown("---")
+        if st.button("🔄 Rebuild totals from Google Sheets", help="Recomputes every bucket from the full sheets (plus entries still queued). Only needed if totals drifted."):
+            with st.spinner("Reading both sheets and recomputing..."):
+                try:
+                    with metrics.span("summary_rebuild", st.session_state.selected_outlet, page):
+                        pending_items = write_queue.pending(st.secrets.gsheets.inventory_sheet_url)
+                        pending_feedback = write_queue.pending(st.secrets.gsheets.feedback_sheet_url)
+                        rollups.rebuild(
+                            sheet_cache.get(st.secrets.gsheets.inventory_sheet_url, force=True),
+                            sheet_cache.get(st.secrets.gsheets.feedback_sheet_url, force=True),
+                            pending_items,
+                            pending_feedback,
+                        )
+                except Exception as e:
+                    st.error(f"🚨 Could not rebuild the summary from Google Sheets. Error: {e}")
+                else:
+                    st.toast("✅ Summary totals rebuilt from Google Sheets.", icon="📈")
+                    st.rerun()
+
+    elif page == "Expiring Soon":
+        st.title("⏰ Expiring Soon")
+        st.markdown("---")
+
+        col_days, col_scope = st.columns(2)
+        with col_days:
+            horizon = st.slider("Expiring within (days)", min_value=1, max_value=90, value=7, key="expiry_horizon")
+        with col_scope:
+            scope = st.selectbox(
+                "Outlet",
+                ["All outlets"] + outlets,
+                index=outlets.index(st.session_state.selected_outlet) + 1 if st.session_state.selected_outlet in outlets else 0,
+                key="expiry_outlet",
+            )
 
-        st.markdown("### 💬 Customer Feedback Records")
-        
         try:
-            feedback_df = conn.read(spreadsheet=st.secrets.gsheets.feedback_sheet_url)
+            with metrics.span("inventory_read", st.session_state.selected_outlet, page):
+                inventory_df = sheet_cache.get(st.secrets.gsheets.inventory_sheet_url)
+            render_sync_caption(st.secrets.gsheets.inventory_sheet_url)
         except Exception as e:
-            st.error(f"🚨 Error loading Feedback Data from Sheet. Please check the sheet URL/permissions. Error: {e}")
-            feedback_df = pd.DataFrame()
+            st.error(f"🚨 Error loading Inventory Data from Sheet; showing the last synced entries. Error: {e}")
+        else:
+            expiry_index.sync(inventory_df)
 
+        with metrics.span("expiry_query", st.session_state.selected_outlet, page):
+            at_risk, expiring = expiry_index.expiring(horizon, None if scope == "All outlets" else [scope])
 
-        if not feedback_df.empty:
-            st.dataframe(feedback_df.iloc[::-1], 
-                         use_container_width=True, 
-                         hide_index=True)
-            
-            csv_feedback = convert_df_to_csv(feedback_df)
-            st.download_button(
-                label="⬇️ Download Feedback Data as CSV",
-                data=csv_feedback,
-                file_name="feedback_data.csv",
-                mime='text/csv',
-                key='download_feedback_csv'
-            )
-            
+        if at_risk.empty:
+            st.success(f"✅ Nothing recorded as expiring in the next {horizon} days.")
         else:
-            st.info("No customer feedback data found in Google Sheets.")
+            col_items, col_qty, col_amount = st.columns(3)
+            col_items.metric("📦 Entries", f"{int(at_risk['items'].sum()):,}")
+            col_qty.metric("🔢 Qty at risk", f"{at_risk['qty'].sum():,.0f}")
+            col_amount.metric("💰 Amount at risk", f"{at_risk['amount'].sum():,.2f}")
+
+            if scope == "All outlets":
+                st.markdown("### 🏪 By Outlet")
+                st.dataframe(at_risk, use_container_width=True, hide_index=True)
+
+            st.markdown("### 📋 Entries by Expiry Date")
+            headers = {name: header for header, (name, _) in INVENTORY_COLUMNS.items()}
+            st.dataframe(expiring.rename(columns=headers), use_container_width=True, hide_index=True,
+                         column_config={"Expiry": st.column_config.DateColumn(format="DD-MMM-YY")})
+
+metrics.observe(
+    "rerun",
+    (time.perf_counter() - rerun_started) * 1000,
+    st.session_state.selected_outlet,
+    page if st.session_state.logged_in else "Login",
+)
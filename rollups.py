@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+
+import pandas as pd
+
+from analytics import FEEDBACK_COLUMNS, INVENTORY_COLUMNS, typed_frame
+
+
+ROLLUP_PATH = ".rollups.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS loss_daily (
+    day TEXT NOT NULL,
+    outlet TEXT NOT NULL,
+    form_type TEXT NOT NULL,
+    supplier TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    qty REAL NOT NULL,
+    amount REAL NOT NULL,
+    gp_sum REAL NOT NULL,
+    gp_count INTEGER NOT NULL,
+    PRIMARY KEY (day, outlet, form_type, supplier)
+);
+CREATE TABLE IF NOT EXISTS rating_daily (
+    day TEXT NOT NULL,
+    outlet TEXT NOT NULL,
+    responses INTEGER NOT NULL,
+    rating_sum REAL NOT NULL,
+    PRIMARY KEY (day, outlet)
+);
+"""
+
+_LOSS_UPSERT = """
+INSERT INTO loss_daily VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, outlet, form_type, supplier) DO UPDATE SET
+    items = items + excluded.items,
+    qty = qty + excluded.qty,
+    amount = amount + excluded.amount,
+    gp_sum = gp_sum + excluded.gp_sum,
+    gp_count = gp_count + excluded.gp_count
+"""
+
+_RATING_UPSERT = """
+INSERT INTO rating_daily VALUES (?, ?, ?, ?)
+ON CONFLICT (day, outlet) DO UPDATE SET
+    responses = responses + excluded.responses,
+    rating_sum = rating_sum + excluded.rating_sum
+"""
+
+
+def _rows(buckets):
+    # Plain Python values: sqlite3 would store numpy integers as blobs.
+    return [tuple(row) for row in buckets.astype(object).itertuples(index=False, name=None)]
+
+
+def _loss_buckets(records):
+    df = typed_frame(pd.DataFrame(records), INVENTORY_COLUMNS)
+    df = df[df["ts"].notna()]
+    keys = pd.DataFrame({
+        "day": df["ts"].dt.strftime("%Y-%m-%d"),
+        "outlet": df["outlet"].fillna(""),
+        "form_type": df["form_type"].fillna(""),
+        "supplier": df["supplier"].fillna(""),
+    })
+    buckets = keys.assign(
+        items=1,
+        qty=df["qty"].fillna(0),
+        amount=df["amount"].fillna(0),
+        gp_sum=df["gp"].fillna(0),
+        gp_count=df["gp"].notna().astype(int),
+    ).groupby(list(keys.columns), as_index=False).sum()
+    return _rows(buckets)
+
+
+def _rating_buckets(records):
+    df = typed_frame(pd.DataFrame(records), FEEDBACK_COLUMNS)
+    df = df[df["ts"].notna() & df["rating"].notna()]
+    buckets = pd.DataFrame({
+        "day": df["ts"].dt.strftime("%Y-%m-%d"),
+        "outlet": df["outlet"].fillna(""),
+        "responses": 1,
+        "rating_sum": df["rating"],
+    }).groupby(["day", "outlet"], as_index=False).sum()
+    return _rows(buckets)
+
+
+def _with_pending(frame, pending):
+    if not len(pending):
+        return frame
+    pending = pd.DataFrame(list(pending))
+    if "Record ID" in frame.columns:
+        pending = pending[~pending["Record ID"].isin(frame["Record ID"].dropna())]
+    return pd.concat([frame, pending], ignore_index=True)
+
+
+class RollupStore:
+    """
+    Running loss and rating totals as daily buckets in a small SQLite file
+    shared by every worker. Each saved record is folded in with an upsert as
+    it is queued, so summaries read a few thousand bucket rows at most instead
+    of the full sheets; rebuild() recomputes everything from the sheets.
+    """
+
+    def __init__(self, path=ROLLUP_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def add_items(self, records):
+        rows = _loss_buckets(records)
+        if rows:
+            with self._db() as db:
+                db.executemany(_LOSS_UPSERT, rows)
+
+    def add_feedback(self, records):
+        rows = _rating_buckets(records)
+        if rows:
+            with self._db() as db:
+                db.executemany(_RATING_UPSERT, rows)
+
+    def rebuild(self, inventory, feedback, pending_items=(), pending_feedback=()):
+        """
+        Replaces every bucket with totals recomputed from the full sheet frames
+        plus the records still queued for them (read the queue first; rows that
+        reached the sheet in between are dropped by Record ID).
+        """
+        inventory = _with_pending(inventory, pending_items)
+        feedback = _with_pending(feedback, pending_feedback)
+        loss = _loss_buckets(inventory) if not inventory.empty else []
+        ratings = _rating_buckets(feedback) if not feedback.empty else []
+        with self._db() as db:
+            db.execute("DELETE FROM loss_daily")
+            db.execute("DELETE FROM rating_daily")
+            db.executemany(_LOSS_UPSERT, loss)
+            db.executemany(_RATING_UPSERT, ratings)
+
+    @staticmethod
+    def _range(start, end):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(str(start))
+        if end is not None:
+            clauses.append("day <= ?")
+            params.append(str(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def loss(self, group_by=("outlet", "form_type"), start=None, end=None):
+        """Items, qty, amount and average GP% per group over the day range."""
+        where, params = self._range(start, end)
+        cols = ", ".join(group_by)
+        sql = (f"SELECT {cols}, SUM(items) AS items, SUM(qty) AS qty, ROUND(SUM(amount), 2) AS amount, "
+               f"ROUND(SUM(gp_sum) / NULLIF(SUM(gp_count), 0), 2) AS avg_gp FROM loss_daily{where} "
+               f"GROUP BY {cols} ORDER BY amount DESC")
+        return pd.read_sql_query(sql, self._db(), params=params)
+
+    def totals(self, start=None, end=None):
+        """Overall amount, entries, average GP%, responses and average rating over the day range."""
+        where, params = self._range(start, end)
+        db = self._db()
+        amount, items, avg_gp = db.execute(
+            f"SELECT ROUND(SUM(amount), 2), SUM(items), ROUND(SUM(gp_sum) / NULLIF(SUM(gp_count), 0), 2) "
+            f"FROM loss_daily{where}", params
+        ).fetchone()
+        responses, avg_rating = db.execute(
+            f"SELECT SUM(responses), ROUND(SUM(rating_sum) / NULLIF(SUM(responses), 0), 2) FROM rating_daily{where}",
+            params,
+        ).fetchone()
+        return {"amount": amount or 0.0, "items": items or 0, "avg_gp": avg_gp,
+                "responses": responses or 0, "avg_rating": avg_rating}
+
+    def ratings(self, start=None, end=None):
+        """Responses and average rating per outlet over the day range."""
+        where, params = self._range(start, end)
+        sql = (f"SELECT outlet, SUM(responses) AS responses, "
+               f"ROUND(SUM(rating_sum) / SUM(responses), 2) AS avg_rating FROM rating_daily{where} "
+               f"GROUP BY outlet ORDER BY avg_rating DESC")
+        return pd.read_sql_query(sql, self._db(), params=params)
+
+    def daily_amount(self, start=None, end=None):
+        where, params = self._range(start, end)
+        sql = (f"SELECT day, form_type, ROUND(SUM(amount), 2) AS amount FROM loss_daily{where} "
+               f"GROUP BY day, form_type ORDER BY day")
+        return pd.read_sql_query(sql, self._db(), params=params)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+
+# Column -> storage type. "category" columns hold int32 codes into a per-buffer
+# list of distinct values; "string" columns hold Python strings.
+ITEM_BUFFER_SCHEMA = {
+    "Timestamp": "string",
+    "Form Type": "category",
+    "Barcode": "string",
+    "Item Name": "string",
+    "Qty": "int32",
+    "Cost": "float64",
+    "Selling": "float64",
+    "Amount": "float64",
+    "GP%": "float64",
+    "Expiry": "category",
+    "Supplier": "category",
+    "Remarks": "string",
+    "Outlet": "category",
+    "Staff Name": "category",
+    "Record ID": "string",
+}
+
+FEEDBACK_BUFFER_SCHEMA = {
+    "Submitted At": "string",
+    "Customer Name": "string",
+    "Rating": "category",
+    "Outlet": "category",
+    "Feedback": "string",
+    "Record ID": "string",
+}
+
+
+class _Column:
+    def __init__(self, kind):
+        self.kind = kind
+        if kind == "category":
+            self.categories, self._codes = [], {}
+            self.values = np.empty(0, dtype=np.int32)
+        else:
+            self.values = np.empty(0, dtype=object if kind == "string" else kind)
+
+    def encode(self, values):
+        if self.kind != "category":
+            return values
+        codes = []
+        for value in values:
+            value = "" if value is None else str(value)
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.categories)
+                self.categories.append(value)
+            codes.append(code)
+        return codes
+
+    def decode(self, stored):
+        if self.kind == "category":
+            return pd.Categorical.from_codes(stored, categories=self.categories)
+        return stored
+
+
+class RecordBuffer:
+    """
+    Append-only columnar store for one session's submitted records.
+    Rows get a stable integer ID; delete only flips a liveness bit. The
+    display frame (indexed by row ID) is cached across reruns and rebuilt
+    from the typed columns, not a list of dicts, after an append or delete.
+    """
+
+    def __init__(self, columns):
+        self.columns = dict(columns)
+        self.clear()
+
+    def clear(self):
+        self._store = {name: _Column(kind) for name, kind in self.columns.items()}
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self._live = 0
+        self._frame = None
+
+    def __len__(self):
+        return self._live
+
+    def _reserve(self, n):
+        capacity = len(self._alive)
+        if self._size + n <= capacity:
+            return
+        capacity = max(16, capacity * 2, self._size + n)
+        self._alive = np.resize(self._alive, capacity)
+        for column in self._store.values():
+            column.values = np.resize(column.values, capacity)
+
+    def extend(self, records):
+        """Appends records (dicts keyed on the buffer's columns); returns their row IDs."""
+        records = list(records)
+        if not records:
+            return []
+        start, n = self._size, len(records)
+        self._reserve(n)
+        for name, column in self._store.items():
+            column.values[start:start + n] = column.encode([r.get(name) for r in records])
+        self._alive[start:start + n] = True
+        self._size += n
+        self._live += n
+        self._frame = None
+        return list(range(start, start + n))
+
+    def append(self, record):
+        return self.extend([record])[0]
+
+    def delete(self, row_id):
+        if 0 <= row_id < self._size and self._alive[row_id]:
+            self._alive[row_id] = False
+            self._live -= 1
+            self._frame = None
+
+    def _rows(self, positions):
+        return pd.DataFrame(
+            {name: column.decode(column.values[positions]) for name, column in self._store.items()},
+            index=pd.Index(positions, name="row_id"),
+        )
+
+    def frame(self):
+        """Live rows in insertion order, indexed by row ID."""
+        if self._frame is None:
+            self._frame = self._rows(np.flatnonzero(self._alive[:self._size]))
+        return self._frame
+
+    def row_ids(self):
+        return self.frame().index.tolist()
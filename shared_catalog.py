@@ -0,0 +1,232 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from catalog import (CACHE_DIR, NAME_COL, SUPPLIER_COL, BarcodeIndex, Catalog, NameIndex,
+                     _file_digest, diff_catalogs, load_catalog_frame, name_pairs)
+
+
+SHARED_DIR = os.path.join(CACHE_DIR, "shared")
+# Bump when the on-disk layout below changes so old segments are never attached.
+LAYOUT = "v1"
+
+_ARRAYS = {
+    "barcode_keys": ("barcode_index", "keys"),
+    "barcode_order": ("barcode_index", "order"),
+    "name_grams": ("name_index", "grams"),
+    "name_offsets": ("name_index", "offsets"),
+    "name_docs": ("name_index", "docs"),
+}
+
+
+def catalog_version(path):
+    """Version stamp for a source file: its content hash plus the layout."""
+    return f"{LAYOUT}-{_file_digest(path)[:16]}"
+
+
+def _write_table(frame, path):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_table(path):
+    # Memory-mapped Arrow IPC: string columns stay backed by the mapped pages.
+    return pa.ipc.open_file(pa.memory_map(path)).read_all().to_pandas()
+
+
+def read_current(root=SHARED_DIR):
+    """The CURRENT stamp: version, published_at, rows and (after a reload) the diff."""
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def current_version(root=SHARED_DIR):
+    return read_current(root).get("version")
+
+
+def publish_catalog(catalog, version, root=SHARED_DIR, keep=2, diff=None):
+    """
+    Writes the catalog frame and its indexes as one read-only segment
+    (Arrow IPC + .npy files) under root/<version>, then flips root/CURRENT
+    to it with an atomic rename. Older segments beyond `keep` are removed;
+    processes still attached to them keep their mappings until they move on.
+    """
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, version)
+    if not os.path.isdir(target):
+        tmp = f"{target}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        _write_table(catalog.frame, os.path.join(tmp, "frame.arrow"))
+        _write_table(catalog.name_index.pairs, os.path.join(tmp, "pairs.arrow"))
+        for name, (owner, attr) in _ARRAYS.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(getattr(catalog, owner), attr))
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Another process published the same version first.
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    current = os.path.join(root, "CURRENT")
+    with open(current + f".tmp-{os.getpid()}", "w") as f:
+        json.dump({"version": version, "published_at": time.time(), "rows": len(catalog.frame), "diff": diff}, f)
+    os.replace(current + f".tmp-{os.getpid()}", current)
+
+    segments = sorted(
+        (d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)) and ".tmp-" not in d and d != version),
+        key=lambda d: os.path.getmtime(os.path.join(root, d)),
+    )
+    for old in segments[:max(0, len(segments) - (keep - 1))]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+
+def attach_catalog(version, root=SHARED_DIR):
+    """Maps a published segment read-only; nothing is copied into this process up front."""
+    segment = os.path.join(root, version)
+    arrays = {name: np.load(os.path.join(segment, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS}
+    return Catalog(
+        _read_table(os.path.join(segment, "frame.arrow")),
+        BarcodeIndex(arrays["barcode_keys"], arrays["barcode_order"]),
+        NameIndex.from_arrays(_read_table(os.path.join(segment, "pairs.arrow")),
+                              arrays["name_grams"], arrays["name_offsets"], arrays["name_docs"]),
+        version=version,
+    )
+
+
+class SharedCatalog:
+    """
+    One process's handle on the shared catalog. The first process to see a
+    new source file builds and publishes it (under a lock file, so a fleet of
+    workers starting together builds it once); every process attaches to the
+    segment named by CURRENT.
+
+    watch() starts a daemon thread that polls the source file's mtime/size
+    (hashing only when those change) and CURRENT. A changed file is rebuilt
+    and diffed against the attached snapshot in the background, reusing the
+    indexes whose inputs did not change, while get() keeps returning the old
+    snapshot until the new one is attached.
+    """
+
+    def __init__(self, path, root=SHARED_DIR, build_timeout=600.0, on_attach=None):
+        self.path = path
+        self.root = root
+        self.build_timeout = build_timeout
+        self.on_attach = on_attach
+        self.catalog = None
+        self.info = {}
+        self.last_error = None
+        self._source = None
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def get(self):
+        """The attached Catalog snapshot (loads it on first use)."""
+        if self.catalog is None:
+            with self._lock:
+                if self.catalog is None:
+                    self._source = self._signature()
+                    self._attach(self._ensure_published(current_version(self.root)))
+        return self.catalog
+
+    def watch(self, interval=10.0):
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True, name="catalog-watch")
+            self._watcher.start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+
+    def refresh(self):
+        """Publishes the source file if it changed, then follows CURRENT."""
+        with self._lock:
+            if self.catalog is None:
+                return
+            signature = self._signature()
+            if signature != self._source:
+                self._ensure_published(current_version(self.root))
+                self._source = signature
+            version = current_version(self.root)
+            if version is not None and version != self.catalog.version:
+                self._attach(version)
+
+    def publish(self):
+        """
+        Builds the catalog from the source file and publishes it as the current
+        version, with its diff against the attached snapshot.
+        """
+        version = catalog_version(self.path)
+        frame = load_catalog_frame(self.path)
+        previous, diff = self.catalog, None
+        barcode_index = name_index = None
+        if previous is not None:
+            diff = diff_catalogs(previous.frame, frame)
+            if frame.equals(previous.frame):
+                barcode_index = previous.barcode_index
+            if name_pairs(frame[NAME_COL], frame[SUPPLIER_COL]).equals(previous.name_index.pairs):
+                name_index = previous.name_index
+        publish_catalog(Catalog(frame, barcode_index, name_index), version, self.root, diff=diff)
+        return version
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _attach(self, version):
+        started = time.perf_counter()
+        catalog = attach_catalog(version, self.root)
+        self.info = read_current(self.root)
+        self.catalog = catalog
+        if self.on_attach is not None:
+            self.on_attach((time.perf_counter() - started) * 1000, version)
+
+    def _ensure_published(self, current):
+        version = catalog_version(self.path)
+        if version == current and os.path.isdir(os.path.join(self.root, version)):
+            return version
+
+        os.makedirs(self.root, exist_ok=True)
+        lock = os.path.join(self.root, "build.lock")
+        deadline = time.time() + self.build_timeout
+        while True:
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    stale = time.time() - os.path.getmtime(lock) > self.build_timeout
+                except OSError:
+                    continue
+                if stale:
+                    try:
+                        os.remove(lock)
+                    except OSError:
+                        pass
+                    continue
+                if current_version(self.root) == version:
+                    return version
+                if time.time() > deadline:
+                    raise TimeoutError(f"catalog build lock {lock} held for over {self.build_timeout}s")
+                time.sleep(0.2)
+                continue
+            try:
+                os.close(fd)
+                if current_version(self.root) == version:
+                    return version
+                return self.publish()
+            finally:
+                os.remove(lock)
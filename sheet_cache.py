@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+class SheetCache:
+    """
+    Process-wide local copy of append-only sheets.
+    Each sheet keeps a row-count watermark; a sync only fetches the rows
+    appended after it, and within `ttl` seconds of the last sync reads are
+    served from memory without touching the backend at all.
+
+    With `partitions` (worksheet names, None for the main tab) a sheet is
+    read as the union of its tabs: each tab keeps its own watermark, and the
+    new rows of every tab are appended to one combined frame, which therefore
+    stays append-only for the readers that track it by row count.
+    """
+
+    def __init__(self, fetch, ttl=60, clean=None, max_workers=4, partitions=None):
+        # fetch(spreadsheet, offset) -> DataFrame of the data rows after `offset`;
+        # with partitions, fetch(spreadsheet, offset, worksheet).
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clean = clean
+        self.partitions = list(partitions) if partitions else None
+        self._sheets = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sheet-fetch")
+        # Tab reads get their own pool: they run inside get()s already on the executor.
+        self._tab_executor = (ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sheet-tab")
+                              if self.partitions else None)
+
+    def _entry(self, spreadsheet):
+        with self._lock:
+            return self._sheets.setdefault(spreadsheet, {
+                "frame": pd.DataFrame(),
+                "rows": 0,
+                "offset": 0,
+                "offsets": {},
+                "synced_at": 0.0,
+                "last_delta": 0,
+                "lock": threading.Lock(),
+            })
+
+    def get(self, spreadsheet, force=False):
+        """Returns the cached sheet, syncing the tail first if it is stale (or `force`)."""
+        entry = self._entry(spreadsheet)
+        with entry["lock"]:
+            if force or time.time() - entry["synced_at"] >= self.ttl:
+                self._sync(entry, spreadsheet)
+            return entry["frame"]
+
+    def get_many(self, spreadsheets, force=False):
+        """
+        Starts a get() for every sheet at once on the fetch pool and returns
+        {spreadsheet: Future}, so callers can render each one as it lands and
+        one failing sheet doesn't hold up the others.
+        """
+        return {spreadsheet: self._executor.submit(self.get, spreadsheet, force) for spreadsheet in spreadsheets}
+
+    def info(self, spreadsheet):
+        entry = self._entry(spreadsheet)
+        return {
+            "rows": entry["rows"],
+            "age_s": time.time() - entry["synced_at"] if entry["synced_at"] else None,
+            "last_delta": entry["last_delta"],
+        }
+
+    def invalidate(self, spreadsheet=None):
+        """Forgets the watermark so the next get re-reads the whole sheet."""
+        with self._lock:
+            if spreadsheet is None:
+                self._sheets.clear()
+            else:
+                self._sheets.pop(spreadsheet, None)
+
+    def _sync(self, entry, spreadsheet):
+        if self.partitions:
+            return self._sync_partitions(entry, spreadsheet)
+        tail = self.fetch(spreadsheet, entry["offset"])
+        if tail is None:
+            tail = pd.DataFrame()
+        offset = entry["offset"] + len(tail)
+        tail = tail.dropna(how="all")
+        frame = entry["frame"]
+        if tail.empty:
+            delta = 0
+        elif frame.empty:
+            frame, delta = tail.reset_index(drop=True), len(tail)
+        elif list(tail.columns) != list(frame.columns):
+            # The header changed under us; the watermark can't be trusted.
+            full = self.fetch(spreadsheet, 0)
+            offset = len(full)
+            frame = full.dropna(how="all").reset_index(drop=True)
+            delta = len(frame) - entry["rows"]
+        else:
+            frame = pd.concat([frame, tail], ignore_index=True)
+            delta = len(tail)
+        if delta and self.clean is not None:
+            frame = self.clean(frame).reset_index(drop=True)
+        entry.update(frame=frame, rows=len(frame), offset=offset,
+                     synced_at=time.time(), last_delta=delta)
+
+    def _sync_partitions(self, entry, spreadsheet):
+        offsets = entry["offsets"]
+        tails = list(self._tab_executor.map(
+            lambda worksheet: self.fetch(spreadsheet, offsets.get(worksheet, 0), worksheet), self.partitions
+        ))
+        new = []
+        for worksheet, tail in zip(self.partitions, tails):
+            if tail is None:
+                continue
+            offsets[worksheet] = offsets.get(worksheet, 0) + len(tail)
+            tail = tail.dropna(how="all")
+            if not tail.empty:
+                new.append(tail)
+        frame = entry["frame"]
+        if new:
+            # Tabs may lag a header change; concat lines columns up by name.
+            frame = pd.concat(new if frame.empty else [frame, *new], ignore_index=True)
+        delta = sum(len(tail) for tail in new)
+        if delta and self.clean is not None:
+            frame = self.clean(frame).reset_index(drop=True)
+        entry.update(frame=frame, rows=len(frame), synced_at=time.time(), last_delta=delta)
@@ -0,0 +1,46 @@
+import threading
+
+import pandas as pd
+
+
+class SheetIndex:
+    """
+    Base for the in-memory indexes over one append-only sheet. sync() feeds
+    _index() the sheet cache rows not seen yet, starting over when the frame
+    shrank (the cache re-read the sheet); add_records() feeds it records as
+    they are queued, and sync() later skips those by Record ID. Subclasses
+    extend _reset() and implement _index(rows), which runs under the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._loaded = 0
+        self._queued = set()
+
+    def sync(self, frame):
+        """Indexes the rows appended to the sheet cache frame since the last call; returns how many."""
+        with self._lock:
+            if len(frame) == self._loaded:
+                return 0
+            if len(frame) < self._loaded:
+                self._reset()
+            rows = frame.iloc[self._loaded:]
+            self._loaded = len(frame)
+            if self._queued and "Record ID" in rows.columns:
+                seen = rows["Record ID"].isin(self._queued)
+                self._queued.difference_update(rows.loc[seen, "Record ID"])
+                rows = rows[~seen]
+            return self._index(rows)
+
+    def add_records(self, records):
+        """Indexes records just queued for the sheet (dicts keyed by sheet header)."""
+        with self._lock:
+            fresh = [r for r in records if r.get("Record ID") not in self._queued]
+            self._queued.update(r["Record ID"] for r in fresh if r.get("Record ID"))
+            return self._index(pd.DataFrame(fresh)) if fresh else 0
+
+    def _index(self, rows):
+        raise NotImplementedError
@@ -0,0 +1,303 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as CallTimeout
+
+import pandas as pd
+
+
+class BackendUnavailable(Exception):
+    """Raised when a storage call times out or fails even after reconnecting."""
+
+
+def is_quota_error(error):
+    """True for rate-limit rejections (HTTP 429 / quota exceeded) rather than real failures."""
+    text = str(error).lower()
+    return "429" in text or "quota" in text or "rate limit" in text
+
+
+class StorageBackend:
+    """
+    Where saved records live. Subclasses implement _connect/_ping/_append/_read
+    for one client; this class adds a small pool of reused clients, health
+    checks on clients idle longer than `health_interval`, a transparent
+    reconnect-and-retry on connection failures, and a per-call timeout so a
+    dead backend fails fast instead of hanging the session that called it.
+    """
+
+    name = "backend"
+    # Failures that mean the client or the link is broken (worth a fresh client).
+    connection_errors = (OSError,)
+
+    def __init__(self, pool_size=4, timeout=20.0, health_interval=60.0):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size * 2, thread_name_prefix=f"{self.name}-call")
+        self.healthy = None
+        self.last_error = None
+        self.reconnects = 0
+
+    # --- subclass hooks -------------------------------------------------
+    def _connect(self):
+        raise NotImplementedError
+
+    def _ping(self, client):
+        pass
+
+    def _append(self, client, spreadsheet, rows, headers, worksheet):
+        raise NotImplementedError
+
+    def _read(self, client, spreadsheet, offset, worksheet):
+        raise NotImplementedError
+
+    # --- public API -----------------------------------------------------
+    def append_rows(self, spreadsheet, rows, headers, worksheet=None):
+        """
+        Appends rows (lists of values, in `headers` order) to one sheet (or one
+        of its tabs). A failed append is never re-sent here: it may have landed
+        anyway, so retrying is left to the write journal's backoff.
+        """
+        self._call(self._append, spreadsheet, rows, headers, worksheet, resend=False)
+
+    def read_since(self, spreadsheet, offset=0, worksheet=None):
+        """Returns the data rows after the first `offset` as a DataFrame."""
+        return self._call(self._read, spreadsheet, offset, worksheet)
+
+    def status(self):
+        return {"backend": self.name, "healthy": self.healthy, "clients": self._created,
+                "idle": self._idle.qsize(), "reconnects": self.reconnects, "last_error": self.last_error}
+
+    # --- pooling --------------------------------------------------------
+    def _acquire(self):
+        while True:
+            try:
+                client, checked_at = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.time() - checked_at < self.health_interval:
+                return client
+            try:
+                self._run(self._ping, client)
+                return client
+            except Exception as e:
+                self._discard(client, e)
+
+        with self._lock:
+            can_create = self._created < self.pool_size
+            if can_create:
+                self._created += 1
+        if not can_create:
+            # Pool exhausted: wait for a client to come back.
+            try:
+                client, _ = self._idle.get(timeout=self.timeout)
+                return client
+            except queue.Empty:
+                raise BackendUnavailable(f"{self.name}: no free client within {self.timeout}s")
+        try:
+            return self._run(self._connect)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _release(self, client):
+        self._idle.put((client, time.time()))
+
+    def _discard(self, client, error):
+        with self._lock:
+            self._created -= 1
+        self.reconnects += 1
+        self.last_error = str(error)
+        close = getattr(client, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def _run(self, fn, *args):
+        future = self._executor.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except CallTimeout:
+            raise BackendUnavailable(f"{self.name}: call timed out after {self.timeout}s")
+
+    def _call(self, fn, *args, resend=True):
+        """
+        Runs fn(client, *args) on a pooled client. Getting a client is retried
+        once; the call itself is retried on a fresh client only after a
+        connection error and only if `resend`. Timeouts are not retried (the
+        call may still complete), and quota or other API errors are raised
+        unchanged without marking the backend unreachable.
+        """
+        error = None
+        for _ in range(2):
+            try:
+                client = self._acquire()
+            except Exception as e:
+                # Nothing was sent yet, so trying again is always safe.
+                error = e
+                continue
+            try:
+                result = self._run(fn, client, *args)
+            except BackendUnavailable as e:
+                self._discard(client, e)
+                error = e
+                break
+            except self.connection_errors as e:
+                self._discard(client, e)
+                error = e
+                if resend:
+                    continue
+                break
+            except Exception as e:
+                # The backend answered (e.g. 429 or a bad request): it is reachable.
+                self._release(client)
+                self.healthy, self.last_error = True, str(e)
+                raise
+            self._release(client)
+            self.healthy, self.last_error = True, None
+            return result
+        self.healthy = False
+        self.last_error = str(error)
+        if isinstance(error, BackendUnavailable):
+            raise error
+        raise BackendUnavailable(f"{self.name}: {error}") from error
+
+
+def _column_letter(n):
+    """1 -> A, 26 -> Z, 27 -> AA."""
+    letters = ""
+    while n:
+        n, rest = divmod(n - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+
+def _gspread(client):
+    # The service-account client behind the gsheets connection, which can open
+    # gspread spreadsheets directly; None for clients without one.
+    inner = getattr(client, "client", None)
+    return inner if hasattr(inner, "_open_spreadsheet") else None
+
+
+class GoogleSheetsBackend(StorageBackend):
+    """
+    Google Sheets through the app's gsheets connection (`connect` opens a new
+    client). Idle clients are health-checked with a metadata read of
+    `ping_spreadsheet` (just its id), which never downloads cell data.
+    """
+
+    name = "gsheets"
+
+    def __init__(self, connect, ping_spreadsheet=None, **kwargs):
+        super().__init__(**kwargs)
+        self.connect = connect
+        self.ping_spreadsheet = ping_spreadsheet
+
+    def _connect(self):
+        return self.connect()
+
+    def _ping(self, client):
+        if self.ping_spreadsheet is None:
+            return
+        gspread = _gspread(client)
+        if gspread is not None:
+            gspread._open_spreadsheet(spreadsheet=self.ping_spreadsheet).fetch_sheet_metadata({"fields": "spreadsheetId"})
+        else:
+            client.read(spreadsheet=self.ping_spreadsheet, ttl=0, nrows=1)
+
+    def _append(self, client, spreadsheet, rows, headers, worksheet):
+        options = {"worksheet": worksheet} if worksheet else {}
+        client.append(spreadsheet=spreadsheet, data=rows, headers=headers, **options)
+
+    def _read(self, client, spreadsheet, offset, worksheet):
+        try:
+            gspread = _gspread(client)
+            if gspread is not None:
+                return self._read_range(gspread, spreadsheet, offset, worksheet)
+            # Clients without a gspread handle download the whole sheet; only parsing is skipped.
+            options = {"skiprows": range(1, offset + 1)} if offset else {}
+            if worksheet:
+                options["worksheet"] = worksheet
+            return client.read(spreadsheet=spreadsheet, ttl=0, **options)
+        except Exception as e:
+            # An outlet tab that has not received its first append yet.
+            if worksheet and type(e).__name__ == "WorksheetNotFound":
+                return pd.DataFrame()
+            raise
+
+    @staticmethod
+    def _read_range(gspread, spreadsheet, offset, worksheet):
+        """Fetches the header row plus rows offset+2 onward only (an A1 range), not the whole sheet."""
+        sheet = gspread._select_worksheet(spreadsheet=spreadsheet, worksheet=worksheet)
+        headers = sheet.row_values(1)
+        if not headers:
+            return pd.DataFrame()
+        rows = sheet.get(f"A{offset + 2}:{_column_letter(len(headers))}")
+        # The API trims trailing empty cells; blanks read as missing, like the full read.
+        data = [[value if value != "" else None for value in row] + [None] * (len(headers) - len(row))
+                for row in rows]
+        return pd.DataFrame(data, columns=headers)
+
+
+def _sheet_key(spreadsheet, worksheet):
+    return f"{spreadsheet}#{worksheet}" if worksheet else spreadsheet
+
+
+class SQLiteBackend(StorageBackend):
+    """Local SQLite file with the same sheet semantics (append-only rows under a header)."""
+
+    name = "sqlite"
+    connection_errors = (OSError, sqlite3.OperationalError)
+
+    def __init__(self, path="outlet_records.sqlite3", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        with sqlite3.connect(path) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS sheet_headers (spreadsheet TEXT PRIMARY KEY, headers TEXT NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS sheet_rows (spreadsheet TEXT NOT NULL, row TEXT NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS sheet_rows_by_sheet ON sheet_rows (spreadsheet)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+
+    def _ping(self, client):
+        client.execute("SELECT 1").fetchone()
+
+    def _append(self, client, spreadsheet, rows, headers, worksheet):
+        spreadsheet = _sheet_key(spreadsheet, worksheet)
+        with client:
+            current = client.execute(
+                "SELECT headers FROM sheet_headers WHERE spreadsheet = ?", (spreadsheet,)
+            ).fetchone()
+            # Like a sheet, the header only grows (e.g. a new trailing column).
+            if current is None or len(headers) > len(json.loads(current[0])):
+                client.execute("INSERT OR REPLACE INTO sheet_headers VALUES (?, ?)",
+                               (spreadsheet, json.dumps(headers)))
+            client.executemany("INSERT INTO sheet_rows VALUES (?, ?)",
+                               [(spreadsheet, json.dumps(row)) for row in rows])
+
+    def _read(self, client, spreadsheet, offset, worksheet):
+        spreadsheet = _sheet_key(spreadsheet, worksheet)
+        header = client.execute(
+            "SELECT headers FROM sheet_headers WHERE spreadsheet = ?", (spreadsheet,)
+        ).fetchone()
+        if header is None:
+            return pd.DataFrame()
+        headers = json.loads(header[0])
+        rows = client.execute(
+            "SELECT row FROM sheet_rows WHERE spreadsheet = ? ORDER BY rowid LIMIT -1 OFFSET ?",
+            (spreadsheet, offset),
+        ).fetchall()
+        data = [json.loads(r[0]) for r in rows]
+        data = [row + [None] * (len(headers) - len(row)) for row in data]
+        return pd.DataFrame(data, columns=headers)
@@ -0,0 +1,288 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from storage import is_quota_error
+
+
+JOURNAL_PATH = ".write_journal.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id TEXT NOT NULL UNIQUE,
+    spreadsheet TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    row TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    claimed_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    outlet TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS rate_bucket (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+# Due rows dealt round-robin across outlets: every outlet's oldest row, then
+# every outlet's second oldest, and so on, so one busy store can't fill a batch.
+_CLAIM = """
+SELECT seq, record_id, spreadsheet, headers, row, attempts, outlet FROM (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY outlet ORDER BY seq) AS turn FROM journal
+    WHERE next_attempt <= ? AND claimed_until < ?
+) ORDER BY turn, seq LIMIT ?
+"""
+
+
+def new_record_id():
+    return uuid.uuid4().hex
+
+
+class WriteQueue:
+    """
+    Write-behind queue for sheet appends.
+    Records are committed to a local SQLite (WAL) journal first, then a
+    background thread sends them to the sheets in coalesced multi-row batches,
+    retrying with exponential backoff until the append succeeds. Rows are
+    claimed with a lease, so several app processes can share one journal.
+
+    Appends are paced by a token bucket kept in the journal itself, so every
+    process sharing it draws from one quota: `rate_per_minute` sink calls,
+    with bursts of up to `burst`. Batches are filled round-robin across
+    outlets, and with `per_outlet_tabs` each outlet's rows go to its own
+    worksheet. Quota rejections wait for the bucket instead of counting as
+    failed attempts.
+    """
+
+    def __init__(self, sink, journal_path=JOURNAL_PATH, batch_size=1000,
+                 flush_interval=1.0, linger=0.25, lease_seconds=120, max_backoff=300, on_flush=None,
+                 rate_per_minute=None, burst=10, per_outlet_tabs=False):
+        # sink(spreadsheet, rows, headers), plus worksheet=<outlet> with per_outlet_tabs.
+        self.sink = sink
+        # on_flush(ms, rows) is called after every successful batch append.
+        self.on_flush = on_flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.linger = linger
+        self.lease_seconds = lease_seconds
+        self.max_backoff = max_backoff
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1, burst)
+        self.per_outlet_tabs = per_outlet_tabs
+
+        self._db = sqlite3.connect(journal_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(journal)")}
+        if "outlet" not in columns:
+            # Journals from before outlet scheduling: their rows share one turn.
+            self._db.execute("ALTER TABLE journal ADD COLUMN outlet TEXT NOT NULL DEFAULT ''")
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._paused_until = 0.0
+        self._served = {}
+
+        self.sent = 0
+        self.failed_batches = 0
+        self.throttled = 0
+        self.last_flush_ms = None
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name="sheet-write-queue", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, spreadsheet, record, record_id, outlet=""):
+        """Journals one record for `spreadsheet`. Re-enqueueing the same record_id is a no-op."""
+        self.enqueue_many(spreadsheet, [record], [record_id], outlet)
+        return record_id
+
+    def enqueue_many(self, spreadsheet, records, record_ids, outlet=""):
+        """Journals a batch in one transaction; it is sent as one multi-row append."""
+        now = time.time()
+        rows = [
+            (record_id, spreadsheet, json.dumps(list(record.keys())),
+             json.dumps(list(record.values())), now, outlet or "")
+            for record, record_id in zip(records, record_ids)
+        ]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO journal (record_id, spreadsheet, headers, row, enqueued_at, outlet) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        self._wake.set()
+
+    def pending(self, spreadsheet):
+        """Records for `spreadsheet` still waiting in the journal, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT headers, row FROM journal WHERE spreadsheet = ? ORDER BY seq", (spreadsheet,)
+            ).fetchall()
+        return [dict(zip(json.loads(headers), json.loads(row))) for headers, row in rows]
+
+    def stats(self):
+        with self._lock:
+            depth, oldest, outlets = self._db.execute(
+                "SELECT COUNT(*), MIN(enqueued_at), COUNT(DISTINCT outlet) FROM journal"
+            ).fetchone()
+            bucket = self._db.execute("SELECT tokens, updated_at FROM rate_bucket WHERE id = 0").fetchone()
+        return {
+            "depth": depth,
+            "oldest_age_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "outlets_waiting": outlets,
+            "sent": self.sent,
+            "failed_batches": self.failed_batches,
+            "throttled": self.throttled,
+            "tokens": round(self._refill(bucket, time.time()), 1) if self.rate_per_minute else None,
+            "paused_s": round(max(0.0, self._paused_until - time.time()), 1),
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error,
+        }
+
+    def flush(self):
+        """Sends every currently due batch the quota allows. Returns the number of rows sent."""
+        sent = 0
+        while time.time() >= self._paused_until:
+            batch = self._claim()
+            if not batch:
+                break
+            sent += self._send(batch)
+        return sent
+
+    def _claim(self):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(_CLAIM, (now, now, self.batch_size)).fetchall()
+                if rows:
+                    self._db.executemany(
+                        "UPDATE journal SET claimed_until = ? WHERE seq = ?",
+                        [(now + self.lease_seconds, r[0]) for r in rows],
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _refill(self, bucket, now):
+        if bucket is None:
+            return float(self.burst)
+        tokens, updated_at = bucket
+        return min(float(self.burst), tokens + (now - updated_at) * self.rate_per_minute / 60.0)
+
+    def _take_token(self):
+        """Spends one sink call from the shared bucket. Returns 0, or the seconds until a token is free."""
+        if not self.rate_per_minute:
+            return 0.0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                tokens = self._refill(
+                    self._db.execute("SELECT tokens, updated_at FROM rate_bucket WHERE id = 0").fetchone(), now
+                )
+                wait = 0.0 if tokens >= 1 else (1 - tokens) * 60.0 / self.rate_per_minute
+                if not wait:
+                    tokens -= 1
+                self._db.execute("INSERT OR REPLACE INTO rate_bucket VALUES (0, ?, ?)", (tokens, now))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return wait
+
+    def _drain_bucket(self):
+        # The API said no: the quota window is spent, whatever our bucket thought.
+        if self.rate_per_minute:
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO rate_bucket VALUES (0, 0, ?)", (time.time(),))
+
+    def _send(self, rows):
+        # One sink call per sheet (and tab). When tokens run short, the tab
+        # served least recently goes first, so calls rotate between outlets.
+        groups = {}
+        for row in rows:
+            worksheet = (row[6] or None) if self.per_outlet_tabs else None
+            groups.setdefault((row[2], worksheet, row[3]), []).append(row)
+
+        sent = 0
+        groups = sorted(groups.items(), key=lambda item: self._served.get(item[0][:2], 0))
+        for i, ((spreadsheet, worksheet, headers), group) in enumerate(groups):
+            wait = self._take_token()
+            if wait:
+                self._pause(wait, [row for _, rest in groups[i:] for row in rest])
+                break
+            started = time.perf_counter()
+            try:
+                data = [json.loads(r[4]) for r in group]
+                if worksheet is None:
+                    self.sink(spreadsheet, data, json.loads(headers))
+                else:
+                    self.sink(spreadsheet, data, json.loads(headers), worksheet=worksheet)
+            except Exception as e:
+                self.last_error = str(e)
+                if is_quota_error(e):
+                    self.throttled += 1
+                    self._drain_bucket()
+                    self._pause(60.0 / self.rate_per_minute if self.rate_per_minute else self.flush_interval,
+                                [row for _, rest in groups[i:] for row in rest])
+                    break
+                self.failed_batches += 1
+                self._release(group, str(e))
+                continue
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+            self._served[(spreadsheet, worksheet)] = time.monotonic()
+            if self.on_flush is not None:
+                self.on_flush(self.last_flush_ms, len(group))
+            with self._lock:
+                self._db.executemany("DELETE FROM journal WHERE seq = ?", [(r[0],) for r in group])
+            self.sent += len(group)
+            sent += len(group)
+        return sent
+
+    def _pause(self, seconds, unsent):
+        """Hands unsent rows back untouched (no attempt counted) and stops flushing for `seconds`."""
+        self._paused_until = time.time() + seconds
+        with self._lock:
+            self._db.executemany("UPDATE journal SET claimed_until = 0 WHERE seq = ?", [(r[0],) for r in unsent])
+
+    def _release(self, group, error):
+        now = time.time()
+        updates = []
+        for row in group:
+            seq, attempts = row[0], row[5]
+            delay = min(self.max_backoff, 2 ** attempts) * (0.5 + random.random())
+            updates.append((attempts + 1, now + delay, error, seq))
+        with self._lock:
+            self._db.executemany(
+                "UPDATE journal SET attempts = ?, next_attempt = ?, claimed_until = 0, last_error = ? "
+                "WHERE seq = ?",
+                updates,
+            )
+
+    def _run(self):
+        while True:
+            if self._wake.wait(max(self.flush_interval, self._paused_until - time.time())):
+                # Give concurrent submissions a moment to land in the same batch.
+                time.sleep(self.linger)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = str(e)